@@ -1,13 +1,26 @@
+import time
+_SCRIPT_START = time.perf_counter()
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import date, datetime, timedelta
-from sklearn.preprocessing import MinMaxScaler
 import warnings
+import importlib
+import sys
 import io
+import os
 import re
+import json
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import zipfile
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import closing, contextmanager
 import logging
 
 # Configure logging
@@ -16,6 +29,59 @@ logger = logging.getLogger(__name__)
 
 warnings.filterwarnings('ignore')
 
+_CORE_IMPORT_SECONDS = time.perf_counter() - _SCRIPT_START
+
+# ========== STARTUP ==========
+# Plotting libraries are only needed once a chart is drawn, so they are imported
+# on first attribute access instead of at module load. Set DASHBOARD_EAGER_IMPORTS=1
+# to pay the cost up front (e.g. when warming a container before traffic).
+EAGER_IMPORTS = os.environ.get('DASHBOARD_EAGER_IMPORTS', '0') == '1'
+
+@st.cache_resource(show_spinner=False)
+def startup_report():
+    """Process-wide record of import and first-render cost, filled in as it happens."""
+    return {'imports': {'streamlit + pandas + numpy': _CORE_IMPORT_SECONDS}, 'stages': {}}
+
+def timed_import(name):
+    """Import a module, recording how long the first import took."""
+    if name in sys.modules:
+        return sys.modules[name]
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - started
+    startup_report()['imports'].setdefault(name, elapsed)
+    logger.info(f"Imported {name} in {elapsed:.3f}s")
+    return module
+
+class LazyModule:
+    """Module proxy that performs the real import on first attribute access."""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = timed_import(self._name)
+        return getattr(self._module, attr)
+
+px = LazyModule('plotly.express')
+go = LazyModule('plotly.graph_objects')
+subplots = LazyModule('plotly.subplots')
+openpyxl = LazyModule('openpyxl')
+pa = LazyModule('pyarrow')
+pq = LazyModule('pyarrow.parquet')
+
+if EAGER_IMPORTS:
+    timed_import('plotly.express')
+    timed_import('plotly.graph_objects')
+
+def min_max_scale(values):
+    """Scale each column to [0, 1]; constant columns map to 0 and NaNs are kept."""
+    values = np.asarray(values, dtype=float)
+    minimum = np.nanmin(values, axis=0)
+    span = np.nanmax(values, axis=0) - minimum
+    return (values - minimum) / np.where(span == 0, 1, span)
+
 # ========== PAGE CONFIGURATION ==========
 st.set_page_config(
     page_title="Sistema Integral NOM-035 & LEAN 2.0",
@@ -27,6 +93,47 @@ st.set_page_config(
 # ========== CONSTANTS AND CONFIGURATION ==========
 DEPARTMENTS = ['Producción', 'Calidad', 'Logística', 'Administración', 'Ventas', 'RH', 'TI', 'Mantenimiento', 'R&D', 'Ingeniería']
 
+NOM_METRICS = ['Evaluaciones', 'Capacitaciones', 'Incidentes', 'Satisfacción Laboral']
+LEAN_METRICS = ['Eficiencia', 'Reducción MURI/MURA/MUDA', 'Proyectos Activos', '5S+2_Score', 'Kaizen Colectivo', 'Tiempo Ciclo']
+WELLBEING_METRICS = ['Índice Bienestar', 'Ausentismo', 'Rotación', 'Encuestas', 'Engagement']
+# Metrics where a lower value is the better result
+LOWER_IS_BETTER = {'Incidentes', 'Tiempo Ciclo', 'Ausentismo', 'Rotación'}
+ACTION_PLAN_COLUMNS = [
+    'ID', 'Departamento', 'Problema', 'Acción', 'Responsable', 'Plazo',
+    'Estado', 'Prioridad', '% Avance', 'Costo Estimado'
+]
+
+# Columns read from each source table; anything else in a wide export is never loaded
+DATA_TABLES = ('nom', 'lean', 'bienestar', 'action_plans')
+TABLE_COLUMNS = {
+    'nom': ['Departamento', 'Mes'] + NOM_METRICS,
+    'lean': ['Departamento', 'Mes'] + LEAN_METRICS,
+    'bienestar': ['Mes'] + WELLBEING_METRICS,
+    'action_plans': ACTION_PLAN_COLUMNS
+}
+TABLE_DATE_COLUMNS = {'nom': 'Mes', 'lean': 'Mes', 'bienestar': 'Mes', 'action_plans': 'Plazo'}
+
+# Compact dtypes applied at load time: low-cardinality labels as categoricals, bounded
+# one-decimal metrics as float32 and counts as small ints
+TABLE_DTYPES = {
+    'nom': {
+        'Departamento': 'category', 'Evaluaciones': 'float32', 'Capacitaciones': 'float32',
+        'Incidentes': 'int8', 'Satisfacción Laboral': 'float32'
+    },
+    'lean': {
+        'Departamento': 'category', 'Eficiencia': 'float32', 'Reducción MURI/MURA/MUDA': 'float32',
+        'Proyectos Activos': 'int8', '5S+2_Score': 'float32', 'Kaizen Colectivo': 'float32', 'Tiempo Ciclo': 'float32'
+    },
+    'bienestar': {
+        'Índice Bienestar': 'float32', 'Ausentismo': 'float32', 'Rotación': 'float32',
+        'Encuestas': 'int8', 'Engagement': 'float32'
+    },
+    'action_plans': {
+        'ID': 'int32', 'Departamento': 'category', 'Responsable': 'category', 'Estado': 'category',
+        'Prioridad': 'category', '% Avance': 'int8', 'Costo Estimado': 'int32'
+    }
+}
+
 COLOR_PALETTE = {
     'primary': '#1e3a8a',
     'secondary': '#3b82f6',
@@ -196,131 +303,1074 @@ h1, h2, h3, h4, h5, h6 {
 """, unsafe_allow_html=True)
 
 # ========== DATA LOADING AND PROCESSING ==========
-@st.cache_data(ttl=600)
+# Synthetic data shape, overridable for load tests (e.g. 500 departments at daily frequency)
+SYNTHETIC_DEPARTMENTS = int(os.environ.get('DASHBOARD_SYNTHETIC_DEPARTMENTS', len(DEPARTMENTS)))
+SYNTHETIC_START = os.environ.get('DASHBOARD_SYNTHETIC_START', '2022-01-01')
+SYNTHETIC_END = os.environ.get('DASHBOARD_SYNTHETIC_END', '2025-12-31')
+SYNTHETIC_FREQ = os.environ.get('DASHBOARD_SYNTHETIC_FREQ', 'M')
+
+# External data source: a directory with <table>.parquet / <table>.csv files, or a SQLite
+# file (.db/.sqlite/.sqlite3) with one table per dataset. Empty means synthetic data.
+DATA_SOURCE = os.environ.get('DASHBOARD_DATA_SOURCE', '')
+# 'mtime' invalidates the cache when a file's mtime/size changes, 'hash' only when its content does
+CACHE_VALIDATION = os.environ.get('DASHBOARD_CACHE_VALIDATION', 'mtime')
+
+PLAN_PROBLEMS = [
+    'Bajo cumplimiento en evaluaciones psicosociales', 'Ineficiencias en la línea de ensamblaje',
+    'Alta rotación en el turno nocturno', 'Exceso de desperdicio en materiales',
+    'Falta de estandarización en procesos', 'Baja participación en capacitaciones',
+    'Retrasos en la cadena de suministro', 'Fallas recurrentes en maquinaria',
+    'Deficiencias en la documentación de procesos', 'Bajo índice de bienestar reportado',
+    'Altos tiempos de ciclo en producción', 'Falta de adopción de 5S+2',
+    'Baja colaboración interdepartamental', 'Errores frecuentes en inventario',
+    'Falta de capacitación en herramientas LEAN', 'Bajo engagement en encuestas',
+    'Exceso de MURA en procesos', 'Problemas de ergonomía en puestos',
+    'Retrasos en proyectos de mejora', 'Falta de comunicación en equipos'
+]
+PLAN_ACTIONS = [
+    'Implementar evaluaciones mensuales', 'Aplicar estudio de tiempos y movimientos',
+    'Mejorar incentivos para turno nocturno', 'Introducir programa 5R para materiales',
+    'Desarrollar manual de procedimientos', 'Programar sesiones de capacitación obligatorias',
+    'Optimizar logística con proveedores', 'Implementar mantenimiento predictivo',
+    'Capacitar equipo en documentación', 'Lanzar programa de bienestar integral',
+    'Rediseñar flujo de producción', 'Auditorías mensuales de 5S+2',
+    'Crear equipos interdepartamentales', 'Implementar sistema de gestión de inventarios',
+    'Capacitar en metodologías LEAN', 'Rediseñar encuestas de engagement',
+    'Estandarizar procesos para reducir MURA', 'Realizar estudios ergonómicos',
+    'Establecer cronogramas estrictos', 'Implementar reuniones diarias de equipo'
+]
+PLAN_OWNERS = [
+    'Ana Gómez', 'Pedro Sánchez', 'Lucía Fernández', 'Carlos Ruiz', 'María López',
+    'Juan Martínez', 'Sofía Pérez', 'Diego García', 'Elena Torres', 'Miguel Ángel',
+    'Laura Ramírez', 'Jorge Díaz', 'Clara Morales', 'Andrés Vega', 'Patricia Soto',
+    'Felipe Castro', 'Marina Ortiz', 'Raúl Méndez', 'Isabel Cruz', 'Héctor Luna'
+]
+
+def department_names(n_departments):
+    """Return n department names, numbering extra units after the base DEPARTMENTS list."""
+    names = DEPARTMENTS[:n_departments]
+    for i in range(len(DEPARTMENTS), n_departments):
+        names.append(f"{DEPARTMENTS[i % len(DEPARTMENTS)]} {i // len(DEPARTMENTS) + 1}")
+    return names
+
+def generate_synthetic_data(n_departments=len(DEPARTMENTS), start='2022-01-01', end='2025-12-31', freq='M', n_plans=20, seed=42):
+    """Build the NOM-035, LEAN, Bienestar and action plan tables with array operations only.
+
+    Every (department, date) row is laid out department-major, so each metric is a single
+    NumPy expression over a (departments x dates) matrix instead of a per-row Python loop.
+    """
+    rng = np.random.default_rng(seed)
+    departments = np.array(department_names(n_departments))
+    dates = pd.date_range(start=start, end=end, freq=freq)
+    n_depts, n_dates = len(departments), len(dates)
+    n_rows = n_depts * n_dates
+    dept_column = np.repeat(departments, n_dates)
+    date_column = np.tile(dates.values, n_depts)
+
+    # NOM-035: one base curve per department, per-metric noise drawn in a single call
+    base_evals = (np.linspace(80, 90, n_dates) + rng.normal(0, 3, (n_depts, n_dates))).ravel()
+    noise = rng.normal(0, [[5], [1], [4]], (3, n_rows))
+    nom_df = pd.DataFrame({
+        'Departamento': dept_column,
+        'Mes': date_column,
+        'Evaluaciones': np.clip(base_evals, 70, 100).round(1),
+        'Capacitaciones': np.clip(base_evals + noise[0], 60, 100).round(1),
+        'Incidentes': np.clip(np.round(10 - base_evals / 10 + noise[1]), 0, 10),
+        'Satisfacción Laboral': np.clip(base_evals + noise[2], 65, 95).round(1)
+    })
+
+    # LEAN
+    base_eff = (np.linspace(75, 85, n_dates) + rng.normal(0, 4, (n_depts, n_dates))).ravel()
+    noise = rng.normal([[0], [0], [0], [5], [0]], [[3], [1], [5], [5], [5]], (5, n_rows))
+    lean_df = pd.DataFrame({
+        'Departamento': dept_column,
+        'Mes': date_column,
+        'Eficiencia': np.clip(base_eff, 60, 95).round(1),
+        'Reducción MURI/MURA/MUDA': np.clip(base_eff / 4 + noise[0], 5, 25).round(1),
+        'Proyectos Activos': np.clip(np.round(base_eff / 20 + noise[1]), 1, 6),
+        '5S+2_Score': np.clip(base_eff + noise[2], 60, 100).round(1),
+        'Kaizen Colectivo': np.clip(base_eff - noise[3], 50, 90).round(1),
+        'Tiempo Ciclo': np.clip(100 - base_eff + noise[4], 10, 50).round(1)
+    })
+
+    # Bienestar (organization-wide, one row per date)
+    base_well = np.linspace(70, 85, n_dates)
+    noise = rng.normal(0, [[2], [0.5], [0.7], [5], [3]], (5, n_dates))
+    bienestar_df = pd.DataFrame({
+        'Mes': dates,
+        'Índice Bienestar': np.clip(base_well + noise[0], 60, 90).round(1),
+        'Ausentismo': np.clip(10 - base_well / 10 + noise[1], 5, 15).round(1),
+        'Rotación': np.clip(15 - base_well / 15 + noise[2], 5, 20).round(1),
+        'Encuestas': np.clip(np.round(80 + noise[3]), 75, 100),
+        'Engagement': np.clip(base_well + noise[4], 60, 90).round(1)
+    })
+
+    # Action Plans
+    action_plans = pd.DataFrame({
+        'ID': np.arange(1, n_plans + 1),
+        'Departamento': rng.choice(departments, n_plans),
+        'Problema': np.resize(PLAN_PROBLEMS, n_plans),
+        'Acción': np.resize(PLAN_ACTIONS, n_plans),
+        'Responsable': np.resize(PLAN_OWNERS, n_plans),
+        'Plazo': pd.date_range(start='2025-01-15', end='2025-10-30', periods=n_plans),
+        'Estado': rng.choice(['Pendiente', 'En progreso', 'Completado'], n_plans, p=[0.3, 0.5, 0.2]),
+        'Prioridad': rng.choice(['Alta', 'Media', 'Baja'], n_plans, p=[0.4, 0.4, 0.2]),
+        '% Avance': rng.choice([0, 25, 50, 75, 100], n_plans),
+        'Costo Estimado': rng.integers(5000, 50000, n_plans)
+    })
+
+    return nom_df, lean_df, bienestar_df, action_plans
+
+def is_sqlite_source(source):
+    return os.path.splitext(source)[1].lower() in ('.db', '.sqlite', '.sqlite3')
+
+def table_path(source, table):
+    """Locate the file backing a table in a directory source, preferring Parquet over CSV."""
+    for ext in ('.parquet', '.csv'):
+        path = os.path.join(source, table + ext)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No se encontró la tabla '{table}' en {source}")
+
+@st.cache_data(show_spinner=False)
+def file_digest(path, mtime_ns, size):
+    """SHA-256 of a file, recomputed only when its mtime or size changes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_fingerprint(tables, source=DATA_SOURCE):
+    """Return a hashable token that changes only when the data of the given tables changes.
+
+    A SQLite source is a single file, so there any table edit changes every fingerprint.
+    """
+    if not source:
+        return ('synthetic', SYNTHETIC_DEPARTMENTS, SYNTHETIC_START, SYNTHETIC_END, SYNTHETIC_FREQ)
+    fingerprint = []
+    for table in tables:
+        try:
+            path = source if is_sqlite_source(source) else table_path(source, table)
+            stat = os.stat(path)
+        except OSError as e:
+            logger.warning(f"Cannot stat data source for {table}: {e}")
+            fingerprint.append((table, None))
+            continue
+        if CACHE_VALIDATION == 'hash':
+            fingerprint.append((table, path, file_digest(path, stat.st_mtime_ns, stat.st_size)))
+        else:
+            fingerprint.append((table, path, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+def read_table(source, table, columns):
+    """Read only the requested columns of a table from a Parquet, CSV or SQLite source."""
+    columns = list(columns)
+    if is_sqlite_source(source):
+        quoted = ', '.join('"' + col.replace('"', '""') + '"' for col in columns)
+        with closing(sqlite3.connect(f"file:{source}?mode=ro", uri=True)) as conn:
+            df = pd.read_sql_query(f'SELECT {quoted} FROM "{table}"', conn)
+    else:
+        path = table_path(source, table)
+        if path.endswith('.parquet'):
+            df = pd.read_parquet(path, columns=columns)
+        else:
+            df = pd.read_csv(path, usecols=columns)
+    date_column = TABLE_DATE_COLUMNS[table]
+    df[date_column] = pd.to_datetime(df[date_column], format='ISO8601')
+    return df[columns]
+
+def apply_schema(df, table):
+    """Cast a table to its compact dtypes; integer columns with missing values fall back to float32.
+
+    Rows without a department or date are dropped: they cannot be placed in the
+    (Departamento, date) index or the metric cubes.
+    """
+    keys = [col for col in ('Departamento', TABLE_DATE_COLUMNS[table]) if col in df.columns]
+    missing = df[keys].isna().any(axis=1)
+    if missing.any():
+        logger.warning(f"Dropping {missing.sum()} {table} rows without {' or '.join(keys)}")
+        df = df[~missing]
+    dtypes = {}
+    for col, dtype in TABLE_DTYPES[table].items():
+        if col not in df.columns:
+            continue
+        if dtype.startswith('int') and df[col].isna().any():
+            dtype = 'float32'
+        dtypes[col] = dtype
+    return df.astype(dtypes)
+
+def read_tables(columns):
+    """Read the {table: columns} selection from DATA_SOURCE (or generate it) and cast it to compact dtypes.
+
+    Returns the frames and a {table: (bytes_before, bytes_after)} memory report.
+    """
+    tables = tuple(columns)
+    if DATA_SOURCE:
+        logger.info(f"Reading {tables} from {DATA_SOURCE}")
+        frames = {table: read_table(DATA_SOURCE, table, columns[table]) for table in tables}
+    else:
+        logger.info("Generating synthetic data...")
+        generated = generate_synthetic_data(
+            n_departments=SYNTHETIC_DEPARTMENTS,
+            start=SYNTHETIC_START,
+            end=SYNTHETIC_END,
+            freq=SYNTHETIC_FREQ
+        )
+        frames = {table: frame[list(columns[table])] for table, frame in zip(DATA_TABLES, generated) if table in tables}
+    memory = {}
+    for table, df in frames.items():
+        compact = apply_schema(df, table)
+        memory[table] = (int(df.memory_usage(deep=True).sum()), int(compact.memory_usage(deep=True).sum()))
+        frames[table] = compact
+        logger.info(f"{table} memory: {memory[table][0]:,} -> {memory[table][1]:,} bytes")
+    return frames, memory
+
+# ========== SHARED DATASET STORE ==========
+# Directory holding one memory-mapped store per data fingerprint
+STORE_DIR = os.environ.get('DASHBOARD_STORE_DIR', os.path.join(tempfile.gettempdir(), 'dashboard_store'))
+STORE_TABLES = ('nom', 'lean', 'bienestar')
+# Bump whenever the on-disk layout or stored dtypes change so stale stores are not reused
+STORE_VERSION = 4
+# Stores no process has used for this long may be deleted once a newer one is built
+STORE_RETENTION_MIN = float(os.environ.get('DASHBOARD_STORE_RETENTION_MIN', 60))
+# How often a process in use of a store refreshes its mark (must stay well below the retention)
+STORE_HEARTBEAT_S = 60
+# Numeric columns of each store table that get a MetricCube
+STORE_METRICS = {'nom': NOM_METRICS, 'lean': LEAN_METRICS, 'bienestar': WELLBEING_METRICS}
+# Columns the store reads: the keys its indexes and cubes are built on, plus the metrics
+STORE_COLUMNS = {
+    table: [col for col in TABLE_COLUMNS[table] if col in ('Departamento', TABLE_DATE_COLUMNS[table]) or col in STORE_METRICS[table]]
+    for table in STORE_TABLES
+}
+
+def sort_and_validate(df, date_column='Mes'):
+    """Sort a table by (Departamento, date) and make the key unique, keeping the last duplicate."""
+    keys = ['Departamento', date_column] if 'Departamento' in df.columns else [date_column]
+    df = df.sort_values(keys, kind='stable')
+    duplicates = df.duplicated(subset=keys, keep='last')
+    if duplicates.any():
+        logger.warning(f"Dropping {duplicates.sum()} duplicate {keys} rows")
+        df = df[~duplicates]
+    return df.reset_index(drop=True)
+
+class FrameIndex:
+    """Positional index over a table sorted by (Departamento, date) with a unique key.
+
+    Each department maps to a contiguous block of rows and dates are ascending inside
+    each block, so a filter is a dict lookup per department plus two binary searches,
+    and a single-block result is returned as a zero-copy slice.
+    """
+
+    def __init__(self, df, date_column='Mes'):
+        self.date_column = date_column
+        self.dates = df[date_column].to_numpy()
+        self.blocks = None
+        if 'Departamento' in df.columns:
+            departments = df['Departamento'].cat
+            codes = departments.codes.to_numpy()
+            # A null department (code -1) would shift every block boundary
+            if (codes < 0).any():
+                raise ValueError("Departamento nulo en una tabla indexada")
+            bounds = np.searchsorted(codes, np.arange(len(departments.categories) + 1))
+            self.blocks = {
+                dept: (bounds[i], bounds[i + 1])
+                for i, dept in enumerate(departments.categories)
+                if bounds[i + 1] > bounds[i]
+            }
+
+    def slices(self, departments, start, end):
+        """Return sorted (start, stop) row ranges matching the departments and [start, end]."""
+        if self.blocks is None:
+            ranges = [(0, len(self.dates))]
+        elif departments:
+            ranges = sorted(self.blocks[dept] for dept in departments if dept in self.blocks)
+        else:
+            ranges = sorted(self.blocks.values())
+        start, end = start.to_datetime64(), end.to_datetime64()
+        slices = []
+        for lo, hi in ranges:
+            block = self.dates[lo:hi]
+            first = lo + np.searchsorted(block, start, side='left')
+            last = lo + np.searchsorted(block, end, side='right')
+            if last > first:
+                slices.append((first, last))
+        return slices
+
+    def select(self, df, departments, start, end):
+        slices = self.slices(departments, start, end)
+        if len(slices) == 1:
+            return df.iloc[slices[0][0]:slices[0][1]]
+        if not slices:
+            return df.iloc[0:0]
+        return df.iloc[np.concatenate([np.arange(first, last) for first, last in slices])]
+
+class MetricCube:
+    """Dense department x period x metric sums and counts of a store table.
+
+    Built once when the store is opened; every per-department or per-period mean a
+    view needs is a slice of `sums` and `counts` followed by a reduction, so rerenders
+    never touch the raw rows. Tables without departments get a single pseudo-department.
+    """
+
+    def __init__(self, df, metrics, date_column='Mes'):
+        self.metrics = list(metrics)
+        self.metric_pos = {metric: i for i, metric in enumerate(self.metrics)}
+        dates = df[date_column].to_numpy()
+        self.periods = np.unique(dates)
+        if 'Departamento' in df.columns:
+            self.departments = list(df['Departamento'].cat.categories)
+            dept_codes = df['Departamento'].cat.codes.to_numpy().astype(np.int64)
+        else:
+            self.departments = [None]
+            dept_codes = np.zeros(len(df), dtype=np.int64)
+        self.dept_pos = {dept: i for i, dept in enumerate(self.departments)}
+        n_depts, n_periods = len(self.departments), len(self.periods)
+        cells = dept_codes * n_periods + np.searchsorted(self.periods, dates)
+        values = df[self.metrics].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+        values = np.where(valid, values, 0.0)
+        size = n_depts * n_periods
+        self.sums = np.stack(
+            [np.bincount(cells, weights=values[:, j], minlength=size) for j in range(len(self.metrics))], axis=-1
+        ).reshape(n_depts, n_periods, -1)
+        self.counts = np.stack(
+            [np.bincount(cells, weights=valid[:, j], minlength=size) for j in range(len(self.metrics))], axis=-1
+        ).reshape(n_depts, n_periods, -1).astype(np.int32)
+        # Prefix sums along the period axis: any window total is prefix[stop] - prefix[start]
+        zeros = np.zeros((n_depts, 1, len(self.metrics)))
+        self.prefix_sums = np.concatenate([zeros, np.cumsum(self.sums, axis=1)], axis=1)
+        self.prefix_counts = np.concatenate([zeros.astype(np.int64), np.cumsum(self.counts, axis=1, dtype=np.int64)], axis=1)
+
+    def window(self, start, end):
+        """Period slice covering the inclusive [start, end] date range."""
+        start, end = pd.Timestamp(start).to_datetime64(), pd.Timestamp(end).to_datetime64()
+        return slice(np.searchsorted(self.periods, start, side='left'), np.searchsorted(self.periods, end, side='right'))
+
+    def rows(self, departments):
+        """Cube rows for the selected departments (all of them when none are selected), in cube order."""
+        if not departments or self.departments == [None]:
+            return np.arange(len(self.departments))
+        return np.array(sorted(self.dept_pos[dept] for dept in departments if dept in self.dept_pos), dtype=np.int64)
+
+    def columns(self, metrics):
+        return np.array([self.metric_pos[metric] for metric in metrics], dtype=np.int64)
+
+    def cells(self, departments, metrics, start, end):
+        """Sums and counts of the (departments x window x metrics) sub-cube."""
+        rows, cols, periods = self.rows(departments), self.columns(metrics), self.window(start, end)
+        return self.sums[rows, periods][:, :, cols], self.counts[rows, periods][:, :, cols], rows, periods
+
+    def window_totals(self, departments, metrics, start, end):
+        """Per-department sums and counts over the window from the prefix sums, O(1) per (department, metric)."""
+        rows, cols, periods = self.rows(departments), self.columns(metrics), self.window(start, end)
+        sums = self.prefix_sums[rows, periods.stop][:, cols] - self.prefix_sums[rows, periods.start][:, cols]
+        counts = self.prefix_counts[rows, periods.stop][:, cols] - self.prefix_counts[rows, periods.start][:, cols]
+        return sums, counts, rows
+
+    def is_empty(self, departments, start, end):
+        """True when no selected department has any value in the window."""
+        rows, periods = self.rows(departments), self.window(start, end)
+        return not (self.prefix_counts[rows, periods.stop] - self.prefix_counts[rows, periods.start]).any()
+
+    def department_means(self, departments, metrics, start, end):
+        """Mean of each metric per department over the window, indexed by Departamento."""
+        sums, counts, rows = self.window_totals(departments, metrics, start, end)
+        present = counts.sum(axis=1) > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums[present] / counts[present]
+        index = pd.Index([self.departments[i] for i in rows[present]], name='Departamento')
+        return pd.DataFrame(means, index=index, columns=list(metrics))
+
+    def mean(self, departments, metric, start, end):
+        """Mean of one metric over all selected rows in the window (NaN when there are none)."""
+        sums, counts, _ = self.window_totals(departments, [metric], start, end)
+        total = counts.sum()
+        return sums.sum() / total if total else np.nan
+
+    def long_series(self, departments, metrics, start, end):
+        """Per (period, department, metric) means in long form: Mes, Departamento, Métrica, Valor."""
+        sums, counts, rows, periods = self.cells(departments, metrics, start, end)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+        # Metric-major layout: (metric, department, period)
+        means = means.transpose(2, 0, 1)
+        n_metrics, n_depts, n_periods = means.shape
+        long_df = pd.DataFrame({
+            'Mes': np.tile(self.periods[periods], n_metrics * n_depts),
+            'Departamento': np.tile(np.repeat([self.departments[i] for i in rows], n_periods), n_metrics),
+            'Métrica': np.repeat(list(metrics), n_depts * n_periods),
+            'Valor': means.ravel()
+        })
+        return long_df[counts.transpose(2, 0, 1).ravel() > 0]
+
+class TrendEngine:
+    """Yearly and quarterly per-department rollups of a MetricCube.
+
+    Rollups are sums and counts taken from the cube's prefix sums at bucket boundaries
+    clipped to the requested window, so partial years/quarters at the window edges are
+    exact. Changes come back as (departments x buckets x metrics) arrays for any metric
+    subset.
+    """
+
+    FREQUENCIES = {'Y': 'Año', 'Q': 'Trimestre'}
+
+    def __init__(self, cube):
+        self.cube = cube
+        periods = pd.DatetimeIndex(cube.periods)
+        self.buckets = {}
+        for freq, labels in (('Y', periods.year.astype(str)), ('Q', periods.to_period('Q').astype(str))):
+            labels = np.asarray(labels)
+            starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+            self.buckets[freq] = (labels[starts], np.r_[starts, len(labels)])
+
+    def rollup(self, freq, departments, metrics, start, end):
+        """Bucket means within the window: (labels, departments, means[D, B, M])."""
+        labels, bounds = self.buckets[freq]
+        window = self.cube.window(start, end)
+        bounds = np.clip(bounds, window.start, window.stop)
+        rows, cols = self.cube.rows(departments), self.cube.columns(metrics)
+        # One gather of the boundary cells, never a copy of whole prefix rows
+        cells = np.ix_(rows, bounds, cols)
+        sums = np.diff(self.cube.prefix_sums[cells], axis=1)
+        counts = np.diff(self.cube.prefix_counts[cells], axis=1)
+        keep = counts.sum(axis=(0, 2)) > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums[:, keep] / counts[:, keep]
+        return labels[keep], [self.cube.departments[i] for i in rows], means
+
+    def changes(self, freq, departments, metrics, start, end):
+        """Percent change against the previous bucket (YoY for 'Y', QoQ for 'Q'); NaN for the first."""
+        labels, depts, means = self.rollup(freq, departments, metrics, start, end)
+        change = np.full_like(means, np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            change[:, 1:] = (means[:, 1:] / means[:, :-1] - 1) * 100
+        change[~np.isfinite(change)] = np.nan
+        return labels, depts, change
+
+    def cagr(self, departments, metrics, start, end):
+        """Compound annual growth (%) between the first and last year in the window: (departments, cagr[D, M])."""
+        labels, depts, means = self.rollup('Y', departments, metrics, start, end)
+        if len(labels) < 2:
+            return depts, np.full((len(depts), len(metrics)), np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            growth = ((means[:, -1] / means[:, 0]) ** (1 / (len(labels) - 1)) - 1) * 100
+        growth[~np.isfinite(growth)] = np.nan
+        return depts, growth
+
+class CorrelationEngine:
+    """Windowed and lagged Pearson correlations assembled from per-period partial sums.
+
+    Each period keeps its row count, column sums and cross-products of the values
+    shifted by the column means (which keeps the one-pass sums numerically stable).
+    Prefix sums over periods turn any date window into the difference of two entries,
+    so a correlation matrix never rescans rows. Lagged correlations pair the period
+    means at t with those at t + lag and keep one prefix array per lag.
+    """
+
+    def __init__(self, df, metrics, date_column='Mes', max_lag=12):
+        self.metrics = list(metrics)
+        self.metric_pos = {metric: i for i, metric in enumerate(self.metrics)}
+        self.periods = np.unique(df[date_column].to_numpy())
+        n_periods, n_metrics = len(self.periods), len(self.metrics)
+        self.max_lag = min(max_lag, max(n_periods - 2, 0))
+
+        values = df[self.metrics].to_numpy(dtype=np.float64)
+        complete = ~np.isnan(values).any(axis=1)
+        values = values[complete]
+        position = np.searchsorted(self.periods, df[date_column].to_numpy()[complete])
+        shifted = values - (values.mean(axis=0) if len(values) else 0)
+
+        counts = np.bincount(position, minlength=n_periods).astype(np.float64)
+        sums = np.stack([np.bincount(position, weights=shifted[:, i], minlength=n_periods) for i in range(n_metrics)], axis=-1)
+        cross = np.empty((n_periods, n_metrics, n_metrics))
+        for i in range(n_metrics):
+            for j in range(i, n_metrics):
+                cross[:, i, j] = cross[:, j, i] = np.bincount(position, weights=shifted[:, i] * shifted[:, j], minlength=n_periods)
+        self.prefix_counts = np.r_[0.0, np.cumsum(counts)]
+        self.prefix_sums = np.concatenate([np.zeros((1, n_metrics)), np.cumsum(sums, axis=0)])
+        self.prefix_cross = np.concatenate([np.zeros((1, n_metrics, n_metrics)), np.cumsum(cross, axis=0)])
+
+        # Lagged partials on period means: pair t with t + lag where both periods have data
+        has_data = counts > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(has_data[:, None], sums / counts[:, None], 0.0)
+        self.lag_prefix = []
+        for lag in range(self.max_lag + 1):
+            pair = (has_data[:n_periods - lag] & has_data[lag:]).astype(np.float64)
+            lead, follow = means[:n_periods - lag] * pair[:, None], means[lag:] * pair[:, None]
+            partials = (
+                pair,
+                lead,
+                follow,
+                lead ** 2,
+                follow ** 2,
+                lead[:, :, None] * follow[:, None, :]
+            )
+            self.lag_prefix.append(tuple(
+                np.concatenate([np.zeros((1,) + part.shape[1:]), np.cumsum(part, axis=0)]) for part in partials
+            ))
+
+    def window(self, start, end):
+        start, end = pd.Timestamp(start).to_datetime64(), pd.Timestamp(end).to_datetime64()
+        return np.searchsorted(self.periods, start, side='left'), np.searchsorted(self.periods, end, side='right')
+
+    def matrix(self, start, end, metrics=None):
+        """Row-level correlation matrix over the window, like DataFrame.corr() on the filtered rows."""
+        metrics = list(metrics or self.metrics)
+        cols = [self.metric_pos[metric] for metric in metrics]
+        lo, hi = self.window(start, end)
+        n = self.prefix_counts[hi] - self.prefix_counts[lo]
+        if n < 2:
+            return pd.DataFrame(np.nan, index=metrics, columns=metrics)
+        sums = (self.prefix_sums[hi] - self.prefix_sums[lo])[cols]
+        cross = (self.prefix_cross[hi] - self.prefix_cross[lo])[np.ix_(cols, cols)]
+        cov = cross - np.outer(sums, sums) / n
+        scale = np.sqrt(np.diag(cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = np.clip(cov / np.outer(scale, scale), -1, 1)
+        return pd.DataFrame(corr, index=metrics, columns=metrics)
+
+    def lagged(self, lead_metric, follow_metric, start, end, lags=None):
+        """Correlation of `lead_metric` at t with `follow_metric` at t + lag, for each lag (periods)."""
+        i, j = self.metric_pos[lead_metric], self.metric_pos[follow_metric]
+        lo, hi = self.window(start, end)
+        lags = range(self.max_lag + 1) if lags is None else lags
+        result = np.full(len(lags), np.nan)
+        for k, lag in enumerate(lags):
+            count, lead, follow, lead_sq, follow_sq, cross = self.lag_prefix[lag]
+            stop = max(lo, hi - lag)
+            n = count[stop] - count[lo]
+            if n < 3:
+                continue
+            sx, sy = lead[stop, i] - lead[lo, i], follow[stop, j] - follow[lo, j]
+            sxx, syy = lead_sq[stop, i] - lead_sq[lo, i], follow_sq[stop, j] - follow_sq[lo, j]
+            sxy = cross[stop, i, j] - cross[lo, i, j]
+            denominator = np.sqrt((sxx - sx * sx / n) * (syy - sy * sy / n))
+            if denominator > 0:
+                result[k] = np.clip((sxy - sx * sy / n) / denominator, -1, 1)
+        return result
+
+class DatasetStore:
+    """Immutable tables backed by memory-mapped .npy column files.
+
+    Numeric and datetime columns map straight into DataFrames without copying; string
+    columns are stored as categorical codes. The pages are read-only and shared by every
+    session in the process (and by other processes on the same host via the OS page cache).
+    """
+
+    def __init__(self, path, frames, memory):
+        self.path = path
+        self.frames = frames
+        self.memory = memory
+        self.touched = 0.0
+        # Keyed by table name, like frames
+        self.indexes = {table: FrameIndex(frame) for table, frame in frames.items()}
+        self.cubes = {
+            table: MetricCube(frame, [m for m in STORE_METRICS[table] if m in frame.columns])
+            for table, frame in frames.items()
+        }
+        self.trends = {table: TrendEngine(cube) for table, cube in self.cubes.items()}
+        self.correlations = {
+            table: CorrelationEngine(frame, [m for m in STORE_METRICS[table] if m in frame.columns])
+            for table, frame in frames.items() if table == 'bienestar'
+        }
+
+    def index_for(self, table, date_column):
+        index = self.indexes[table]
+        return index if index.date_column == date_column else None
+
+    def touch(self):
+        """Mark the store as in use, at most once per heartbeat, so no process prunes it."""
+        now = time.time()
+        if now - self.touched >= STORE_HEARTBEAT_S:
+            self.touched = now
+            try:
+                os.utime(os.path.join(self.path, 'schema.json'))
+            except OSError as e:
+                logger.warning(f"Cannot mark dataset store {self.path} as in use: {e}")
+
+    def version_of(self, table):
+        """Cache key identifying a store table and the data it was built from."""
+        return (os.path.basename(self.path), table)
+
+    @staticmethod
+    def write(path, frames, memory):
+        """Materialize frames as column files, publishing the directory atomically."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = tempfile.mkdtemp(prefix='.building-', dir=os.path.dirname(path))
+        schema = {}
+        for table, df in frames.items():
+            os.makedirs(os.path.join(tmp_path, table))
+            columns = []
+            for i, col in enumerate(df.columns):
+                # Column names contain '/' and accents, so files are named by position
+                spec = {'name': col, 'file': f"{i}.npy"}
+                values = df[col]
+                if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+                    array = values.to_numpy()
+                else:
+                    categorical = pd.Categorical(values)
+                    spec['categories'] = categorical.categories.tolist()
+                    array = categorical.codes
+                np.save(os.path.join(tmp_path, table, spec['file']), array)
+                columns.append(spec)
+            schema[table] = columns
+        with open(os.path.join(tmp_path, 'schema.json'), 'w', encoding='utf-8') as f:
+            json.dump({'tables': schema, 'memory': memory}, f, ensure_ascii=False)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another worker published the same store first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, 'schema.json'), encoding='utf-8') as f:
+            schema = json.load(f)
+        frames = {}
+        for table, columns in schema['tables'].items():
+            data = {}
+            for spec in columns:
+                array = np.load(os.path.join(path, table, spec['file']), mmap_mode='r')
+                if 'categories' in spec:
+                    array = pd.Categorical.from_codes(array, categories=spec['categories'])
+                data[spec['name']] = array
+            frames[table] = pd.DataFrame(data, copy=False)
+        return cls(path, frames, {table: tuple(sizes) for table, sizes in schema['memory'].items()})
+
+# Stores opened by this process, by path, for as long as anything still holds them
+_open_stores = weakref.WeakValueDictionary()
+
+def prune_stores(keep):
+    """Delete the store directories under STORE_DIR that nothing uses any more.
+
+    A store is kept while this process still holds it or while any process has marked
+    it in use (DatasetStore.touch) within the last STORE_RETENTION_MIN minutes.
+    """
+    cutoff = time.time() - STORE_RETENTION_MIN * 60
+    for name in os.listdir(STORE_DIR):
+        path = os.path.join(STORE_DIR, name)
+        if path == keep or path in _open_stores or not re.fullmatch(r'[0-9a-f]{40}', name):
+            continue
+        try:
+            if os.stat(os.path.join(path, 'schema.json')).st_mtime >= cutoff:
+                continue
+        except OSError:
+            # Unreadable or half-deleted stores are not worth keeping
+            pass
+        logger.info(f"Removing stale dataset store {path}")
+        shutil.rmtree(path, ignore_errors=True)
+
+# One store per process: a new fingerprint evicts the previous store and its in-RAM cubes
+@st.cache_resource(show_spinner=False, max_entries=1)
+def open_dataset_store(fingerprint):
+    """Open (building on first use) the store for a data fingerprint, once per process.
+
+    Call it through dataset_store(), which always passes the current fingerprint, so an
+    outdated one can never rebuild (and re-publish) an old store.
+    """
+    path = os.path.join(STORE_DIR, hashlib.sha1(repr((STORE_VERSION, fingerprint)).encode('utf-8')).hexdigest())
+    built = not os.path.exists(os.path.join(path, 'schema.json'))
+    if built:
+        logger.info(f"Building dataset store at {path}")
+        frames, memory = read_tables(STORE_COLUMNS)
+        DatasetStore.write(path, {table: sort_and_validate(df) for table, df in frames.items()}, memory)
+    logger.info(f"Opening dataset store at {path}")
+    store = DatasetStore.open(path)
+    _open_stores[path] = store
+    # Cached views slice the previous store's memmaps and would keep them mapped
+    get_filter_cache().clear()
+    if built:
+        # Only once the new store is published and opened
+        prune_stores(path)
+    return store
+
+def previous_window(start, end):
+    """The window of the same number of days that ends the day before `start`."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    length = end - start + pd.Timedelta(days=1)
+    return start - length, start - pd.Timedelta(days=1)
+
+def dataset_store():
+    """Return the store for the data as it is now.
+
+    Fragments rerun without the module-level code, so the fingerprint is taken afresh
+    (a stat per table) instead of trusting the one from the last full run.
+    """
+    store = open_dataset_store(source_fingerprint(STORE_TABLES))
+    store.touch()
+    return store
+
+def metric_cube(table):
+    """Return the precomputed MetricCube of a shared store table."""
+    return dataset_store().cubes[table]
+
+def trend_engine(table):
+    """Return the TrendEngine of a shared store table."""
+    return dataset_store().trends[table]
+
+def correlation_engine(table):
+    """Return the CorrelationEngine of a shared store table."""
+    return dataset_store().correlations[table]
+
+# ========== SHARED CACHES ==========
+class ByteBoundedLRU:
+    """LRU of values shared by every session in the process, bounded by their total size.
+
+    Subclasses define size_of(value). The newest entry is always kept, even when it
+    alone exceeds the budget.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def size_of(self, value):
+        raise NotImplementedError
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        nbytes = int(self.size_of(value))
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entries[key][1]
+            self.entries[key] = (value, nbytes)
+            self.entries.move_to_end(key)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries),
+                    'bytes': self.bytes, 'max_bytes': self.max_bytes}
+
+# ========== FILTERED VIEW CACHE ==========
+FILTER_CACHE_MB = float(os.environ.get('DASHBOARD_FILTER_CACHE_MB', 256))
+
+class FilterCache(ByteBoundedLRU):
+    """Byte-bounded LRU of filtered store views.
+
+    Entries are sized by the frame's memory; a multi-department view is a row copy,
+    so a count limit alone would let a few wide date ranges hold gigabytes. Views are
+    read-only slices of the shared store, so callers must derive new frames rather
+    than assign into them.
+    """
+
+    def size_of(self, value):
+        return value.memory_usage(index=True).sum()
+
+@st.cache_resource(show_spinner=False)
+def get_filter_cache():
+    return FilterCache(int(FILTER_CACHE_MB * 1024 * 1024))
+
+# ========== FIGURE CACHE ==========
+FIGURE_CACHE_MB = float(os.environ.get('DASHBOARD_FIGURE_CACHE_MB', 64))
+
+class FigureCache(ByteBoundedLRU):
+    """Byte-bounded LRU of built Plotly figures.
+
+    Entries are sized by their serialized JSON, which is what a render ships to the
+    browser. Figures are shared, so callers must not update them once cached.
+    """
+
+    def size_of(self, value):
+        return len(value.to_json())
+
+    def view_bytes(self):
+        """Serialized size of the most recently used figure of each view."""
+        with self.lock:
+            return {key[0]: nbytes for key, (_, nbytes) in self.entries.items()}
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    return FigureCache(int(FIGURE_CACHE_MB * 1024 * 1024))
+
+def cached_figure(view_id, params, build):
+    """Return the figure of `view_id` for `params`, calling `build()` only on a cache miss.
+
+    `params` must hold everything the figure depends on besides the dataset (filters,
+    metrics, targets); the store version is part of the key, so reloading the data
+    never serves stale figures. `build` may return None when there is nothing to plot.
+    """
+    cache = get_figure_cache()
+    key = (view_id, os.path.basename(dataset_store().path), params)
+    figure = cache.get(key)
+    if figure is None:
+        figure = build()
+        if figure is not None:
+            cache.put(key, figure)
+    return figure
+
+@st.cache_data
+def load_action_plans(fingerprint):
+    frames, memory = read_tables({'action_plans': ACTION_PLAN_COLUMNS})
+    return frames['action_plans'], memory['action_plans']
+
+def memory_report():
+    """Bytes per table before and after the compact schema, as a display-ready frame."""
+    memory = dict(dataset_store().memory)
+    memory['action_plans'] = load_action_plans(source_fingerprint(('action_plans',)))[1]
+    report = pd.DataFrame(
+        [(table, before / 1024, after / 1024) for table, (before, after) in memory.items()],
+        columns=['Tabla', 'Antes (KB)', 'Después (KB)']
+    )
+    report['Reducción (%)'] = (1 - report['Después (KB)'] / report['Antes (KB)']) * 100
+    return report
+
 def load_data():
+    """Return the shared read-only tables for the current data."""
     try:
-        logger.info("Loading data...")
-        np.random.seed(42)
-        n_depts = len(DEPARTMENTS)
-
-        # NOM-035 Data (2022-2025, monthly)
-        dates = pd.date_range(start='2022-01-01', end='2025-12-31', freq='M')
-        nom_data = []
-        for dept in DEPARTMENTS:
-            base_evals = np.linspace(80, 90, len(dates)) + np.random.normal(0, 3, len(dates))
-            for i, date_val in enumerate(dates):
-                nom_data.append({
-                    'Departamento': dept,
-                    'Mes': date_val,
-                    'Evaluaciones': np.clip(base_evals[i], 70, 100).round(1),
-                    'Capacitaciones': np.clip(base_evals[i] + np.random.normal(0, 5), 60, 100).round(1),
-                    'Incidentes': np.clip(np.round(10 - base_evals[i] / 10 + np.random.normal(0, 1)), 0, 10),
-                    'Satisfacción Laboral': np.clip(base_evals[i] + np.random.normal(0, 4), 65, 95).round(1)
-                })
-        nom_df = pd.DataFrame(nom_data)
-        nom_df['Mes'] = pd.to_datetime(nom_df['Mes'])  # Ensure datetime64
-        nom_df = nom_df.drop_duplicates(subset=['Departamento', 'Mes'])
-        logger.info(f"NOM-035 DataFrame shape: {nom_df.shape}, Mes dtype: {nom_df['Mes'].dtype}, Duplicates: {nom_df.duplicated(subset=['Departamento', 'Mes']).sum()}")
-
-        # LEAN Data (2022-2025, monthly)
-        lean_data = []
-        for dept in DEPARTMENTS:
-            base_eff = np.linspace(75, 85, len(dates)) + np.random.normal(0, 4, len(dates))
-            for i, date_val in enumerate(dates):
-                lean_data.append({
-                    'Departamento': dept,
-                    'Mes': date_val,
-                    'Eficiencia': np.clip(base_eff[i], 60, 95).round(1),
-                    'Reducción MURI/MURA/MUDA': np.clip(base_eff[i] / 4 + np.random.normal(0, 3), 5, 25).round(1),
-                    'Proyectos Activos': np.clip(np.round(base_eff[i] / 20 + np.random.normal(0, 1)), 1, 6),
-                    '5S+2_Score': np.clip(base_eff[i] + np.random.normal(0, 5), 60, 100).round(1),
-                    'Kaizen Colectivo': np.clip(base_eff[i] - np.random.normal(5, 5), 50, 90).round(1),
-                    'Tiempo Ciclo': np.clip(100 - base_eff[i] + np.random.normal(0, 5), 10, 50).round(1)
-                })
-        lean_df = pd.DataFrame(lean_data)
-        lean_df['Mes'] = pd.to_datetime(lean_df['Mes'])  # Ensure datetime64
-        lean_df = lean_df.drop_duplicates(subset=['Departamento', 'Mes'])
-        logger.info(f"LEAN DataFrame shape: {lean_df.shape}, Mes dtype: {lean_df['Mes'].dtype}, Duplicates: {lean_df.duplicated(subset=['Departamento', 'Mes']).sum()}")
-
-        # Bienestar Data (2022-2025, monthly)
-        base_well = np.linspace(70, 85, len(dates))
-        bienestar_df = pd.DataFrame({
-            'Mes': dates,
-            'Índice Bienestar': np.clip(base_well + np.random.normal(0, 2, len(dates)), 60, 90).round(1),
-            'Ausentismo': np.clip(10 - base_well / 10 + np.random.normal(0, 0.5, len(dates)), 5, 15).round(1),
-            'Rotación': np.clip(15 - base_well / 15 + np.random.normal(0, 0.7, len(dates)), 5, 20).round(1),
-            'Encuestas': np.clip(np.round(80 + np.random.normal(0, 5, len(dates))), 75, 100),
-            'Engagement': np.clip(base_well + np.random.normal(0, 3, len(dates)), 60, 90).round(1)
-        })
-        bienestar_df['Mes'] = pd.to_datetime(bienestar_df['Mes'])  # Ensure datetime64
-        bienestar_df = bienestar_df.drop_duplicates(subset=['Mes'])
-        logger.info(f"Bienestar DataFrame shape: {bienestar_df.shape}, Mes dtype: {bienestar_df['Mes'].dtype}, Duplicates: {bienestar_df.duplicated(subset=['Mes']).sum()}")
-
-        # Action Plans
-        action_plans = pd.DataFrame({
-            'ID': range(1, 21),
-            'Departamento': np.random.choice(DEPARTMENTS, 20),
-            'Problema': [
-                'Bajo cumplimiento en evaluaciones psicosociales', 'Ineficiencias en la línea de ensamblaje',
-                'Alta rotación en el turno nocturno', 'Exceso de desperdicio en materiales',
-                'Falta de estandarización en procesos', 'Baja participación en capacitaciones',
-                'Retrasos en la cadena de suministro', 'Fallas recurrentes en maquinaria',
-                'Deficiencias en la documentación de procesos', 'Bajo índice de bienestar reportado',
-                'Altos tiempos de ciclo en producción', 'Falta de adopción de 5S+2',
-                'Baja colaboración interdepartamental', 'Errores frecuentes en inventario',
-                'Falta de capacitación en herramientas LEAN', 'Bajo engagement en encuestas',
-                'Exceso de MURA en procesos', 'Problemas de ergonomía en puestos',
-                'Retrasos en proyectos de mejora', 'Falta de comunicación en equipos'
-            ],
-            'Acción': [
-                'Implementar evaluaciones mensuales', 'Aplicar estudio de tiempos y movimientos',
-                'Mejorar incentivos para turno nocturno', 'Introducir programa 5R para materiales',
-                'Desarrollar manual de procedimientos', 'Programar sesiones de capacitación obligatorias',
-                'Optimizar logística con proveedores', 'Implementar mantenimiento predictivo',
-                'Capacitar equipo en documentación', 'Lanzar programa de bienestar integral',
-                'Rediseñar flujo de producción', 'Auditorías mensuales de 5S+2',
-                'Crear equipos interdepartamentales', 'Implementar sistema de gestión de inventarios',
-                'Capacitar en metodologías LEAN', 'Rediseñar encuestas de engagement',
-                'Estandarizar procesos para reducir MURA', 'Realizar estudios ergonómicos',
-                'Establecer cronogramas estrictos', 'Implementar reuniones diarias de equipo'
-            ],
-            'Responsable': [
-                'Ana Gómez', 'Pedro Sánchez', 'Lucía Fernández', 'Carlos Ruiz', 'María López',
-                'Juan Martínez', 'Sofía Pérez', 'Diego García', 'Elena Torres', 'Miguel Ángel',
-                'Laura Ramírez', 'Jorge Díaz', 'Clara Morales', 'Andrés Vega', 'Patricia Soto',
-                'Felipe Castro', 'Marina Ortiz', 'Raúl Méndez', 'Isabel Cruz', 'Héctor Luna'
-            ],
-            'Plazo': pd.date_range(start='2025-01-15', end='2025-10-30', periods=20),
-            'Estado': np.random.choice(['Pendiente', 'En progreso', 'Completado'], 20, p=[0.3, 0.5, 0.2]),
-            'Prioridad': np.random.choice(['Alta', 'Media', 'Baja'], 20, p=[0.4, 0.4, 0.2]),
-            '% Avance': np.random.choice([0, 25, 50, 75, 100], 20),
-            'Costo Estimado': np.random.randint(5000, 50000, 20)
-        })
-        action_plans['Plazo'] = pd.to_datetime(action_plans['Plazo'])  # Ensure datetime64
-        action_plans = action_plans.drop_duplicates(subset=['ID', 'Departamento', 'Plazo'])
-        logger.info(f"Action Plans DataFrame shape: {action_plans.shape}, Plazo dtype: {action_plans['Plazo'].dtype}, Duplicates: {action_plans.duplicated(subset=['ID', 'Departamento', 'Plazo']).sum()}")
+        started = time.perf_counter()
+        frames = dataset_store().frames
+        startup_report()['stages'].setdefault('Carga de datos', time.perf_counter() - started)
+        nom_df, lean_df, bienestar_df = (frames[table] for table in STORE_TABLES)
+        logger.info(f"NOM-035 DataFrame shape: {nom_df.shape}, Mes dtype: {nom_df['Mes'].dtype}")
+        logger.info(f"LEAN DataFrame shape: {lean_df.shape}, Mes dtype: {lean_df['Mes'].dtype}")
+        logger.info(f"Bienestar DataFrame shape: {bienestar_df.shape}, Mes dtype: {bienestar_df['Mes'].dtype}")
 
-        return nom_df, lean_df, bienestar_df, action_plans
+        return nom_df, lean_df, bienestar_df
     except Exception as e:
         logger.error(f"Error loading data: {e}")
         st.error(f"Error al cargar datos: {e}", icon="🚨")
-        return None, None, None, None
-
-# Initialize session state
-if 'action_plans_df' not in st.session_state:
-    logger.info("Initializing session state for action plans")
-    nom_df, lean_df, bienestar_df, action_plans = load_data()
-    if action_plans is None:
-        st.error("No se pudieron cargar los planes de acción.", icon="🚨")
-        st.session_state.action_plans_df = pd.DataFrame(columns=[
-            'ID', 'Departamento', 'Problema', 'Acción', 'Responsable', 'Plazo',
-            'Estado', 'Prioridad', '% Avance', 'Costo Estimado'
-        ])
-    else:  
-        st.session_state.action_plans_df = action_plans
+        return None, None, None
+
+# ========== ACTION PLAN STORE ==========
+# Action plans live in a SQLite database shared by every session and kept across restarts;
+# an empty database is seeded from the data source on first use. Unlike the derived
+# column store it is user data, so it defaults to a directory next to the app rather
+# than the temp dir (point DASHBOARD_DATA_DIR at a mounted volume in containers)
+DATA_DIR = os.environ.get('DASHBOARD_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+PLANS_DB = os.environ.get('DASHBOARD_PLANS_DB', os.path.join(DATA_DIR, 'action_plans.sqlite'))
+
+class ActionPlanStore:
+    """Action plans in a local SQLite database.
+
+    IDs come from AUTOINCREMENT, inserts are batched in one transaction, and reads filter
+    through the (Departamento, Plazo) and Estado indexes instead of copying the table.
+    A partial index on Plazo over plans that are not completed is the deadline index:
+    SQLite keeps it current on every insert and status change.
+    Plazo is stored as 'YYYY-MM-DD HH:MM:SS' text, so string order is date order.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS action_plans (
+            "ID" INTEGER PRIMARY KEY AUTOINCREMENT,
+            "Departamento" TEXT NOT NULL,
+            "Problema" TEXT NOT NULL,
+            "Acción" TEXT NOT NULL,
+            "Responsable" TEXT NOT NULL,
+            "Plazo" TEXT NOT NULL,
+            "Estado" TEXT NOT NULL,
+            "Prioridad" TEXT NOT NULL,
+            "% Avance" INTEGER NOT NULL,
+            "Costo Estimado" INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_action_plans_dept_plazo ON action_plans ("Departamento", "Plazo");
+        CREATE INDEX IF NOT EXISTS idx_action_plans_estado ON action_plans ("Estado");
+        CREATE INDEX IF NOT EXISTS idx_action_plans_open_plazo ON action_plans ("Plazo") WHERE "Estado" != 'Completado';
+    """
+    DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.connection() as conn:
+            # WAL lets sessions keep reading while another one writes
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def connection(self):
+        """A connection whose transaction commits on success and rolls back on error."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def quote(column):
+        return '"' + column.replace('"', '""') + '"'
+
+    def rows(self, plans, columns):
+        """Plan rows as plain Python tuples in `columns` order, Plazo as sortable text."""
+        plans = plans.assign(Plazo=pd.to_datetime(plans['Plazo']).dt.strftime(self.DATE_FORMAT))
+        return list(plans[columns].astype(object).itertuples(index=False, name=None))
+
+    def seed(self, plans):
+        """Load `plans` with their own IDs if the store is still empty; returns rows written."""
+        with self.connection() as conn:
+            # BEGIN IMMEDIATE takes the write lock, so concurrent seeders cannot both see an empty table
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute('SELECT EXISTS (SELECT 1 FROM action_plans)').fetchone()[0]:
+                return 0
+            columns = ACTION_PLAN_COLUMNS
+            conn.executemany(
+                f"INSERT INTO action_plans ({', '.join(map(self.quote, columns))}) VALUES ({', '.join('?' * len(columns))})",
+                self.rows(plans, columns)
+            )
+        logger.info(f"Seeded action plan store with {len(plans)} plans")
+        return len(plans)
+
+    def insert(self, plans):
+        """Insert new plans in one transaction and return their allocated IDs."""
+        columns = [col for col in ACTION_PLAN_COLUMNS if col != 'ID']
+        rows = self.rows(plans, columns)
+        if not rows:
+            return []
+        with self.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                f"INSERT INTO action_plans ({', '.join(map(self.quote, columns))}) VALUES ({', '.join('?' * len(columns))})",
+                rows
+            )
+            # The write lock is held, so this batch got the last len(rows) sequence values
+            last_id = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'action_plans'").fetchone()[0]
+        logger.info(f"Inserted {len(rows)} action plans")
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+
+    def where(self, departments=None, start=None, end=None, states=None):
+        """WHERE clause and parameters matching the indexed filters that are set."""
+        clauses, params = [], []
+        if departments:
+            clauses.append(f'"Departamento" IN ({", ".join("?" * len(departments))})')
+            params.extend(departments)
+        if start is not None:
+            clauses.append('"Plazo" >= ?')
+            params.append(pd.Timestamp(start).strftime(self.DATE_FORMAT))
+        if end is not None:
+            clauses.append('"Plazo" <= ?')
+            params.append(pd.Timestamp(end).strftime(self.DATE_FORMAT))
+        if states:
+            clauses.append(f'"Estado" IN ({", ".join("?" * len(states))})')
+            params.extend(states)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def query(self, sql, params=()):
+        """Run a SELECT over action_plans and return it with the action plan schema applied."""
+        with self.connection() as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+        df['Plazo'] = pd.to_datetime(df['Plazo'], format=self.DATE_FORMAT)
+        return apply_schema(df[ACTION_PLAN_COLUMNS], 'action_plans')
+
+    def read(self, departments=None, start=None, end=None, states=None):
+        """Plans matching the filters, ordered by ID."""
+        where, params = self.where(departments, start, end, states)
+        return self.query(f'SELECT * FROM action_plans{where} ORDER BY "ID"', params)
+
+    def chunks(self, departments=None, start=None, end=None, size=50_000):
+        """Plans matching the filters in ID order, size rows at a time.
+
+        Pages by the last ID seen rather than OFFSET, so each chunk is a primary key
+        range seek. The first chunk is yielded even when empty, to carry the schema.
+        """
+        where, params = self.where(departments, start, end)
+        where += (' AND ' if where else ' WHERE ') + '"ID" > ?'
+        last = 0
+        while True:
+            chunk = self.query(f'SELECT * FROM action_plans{where} ORDER BY "ID" LIMIT ?', params + [last, int(size)])
+            if chunk.empty and last:
+                return
+            yield chunk
+            if len(chunk) < size:
+                return
+            last = int(chunk['ID'].iloc[-1])
+
+    def page(self, departments=None, start=None, end=None, states=None, order_by='ID', descending=False, limit=25, offset=0):
+        """One page of the plans matching the filters, sorted in SQL with ID breaking ties."""
+        if order_by not in ACTION_PLAN_COLUMNS:
+            raise ValueError(f"Columna de orden no válida: {order_by}")
+        where, params = self.where(departments, start, end, states)
+        direction = 'DESC' if descending else 'ASC'
+        return self.query(
+            f'SELECT * FROM action_plans{where} ORDER BY {self.quote(order_by)} {direction}, "ID" {direction} LIMIT ? OFFSET ?',
+            params + [int(limit), int(offset)]
+        )
+
+    # Must match the partial index predicate for SQLite to use idx_action_plans_open_plazo
+    OPEN_CLAUSE = "\"Estado\" != 'Completado'"
+
+    def deadline_where(self, departments, start, end):
+        """WHERE clause over open plans with start <= Plazo < end."""
+        clauses = [self.OPEN_CLAUSE, '"Plazo" >= ?', '"Plazo" < ?']
+        params = [pd.Timestamp(start).strftime(self.DATE_FORMAT), pd.Timestamp(end).strftime(self.DATE_FORMAT)]
+        if departments:
+            clauses.append(f'"Departamento" IN ({", ".join("?" * len(departments))})')
+            params.extend(departments)
+        return ' WHERE ' + ' AND '.join(clauses), params
+
+    def deadlines(self, departments, start, end, limit, offset=0):
+        """A page of open plans with start <= Plazo < end, earliest deadline first.
+
+        The deadline index already holds open plans in (Plazo, ID) order, so a page is
+        a range seek plus `offset + limit` index steps, with no scan or sort. INDEXED BY
+        keeps the planner from preferring the department index and sorting its matches.
+        """
+        where, params = self.deadline_where(departments, start, end)
+        return self.query(
+            f'SELECT * FROM action_plans INDEXED BY idx_action_plans_open_plazo{where} ORDER BY "Plazo", "ID" LIMIT ? OFFSET ?',
+            params + [int(limit), int(offset)]
+        )
+
+    def deadline_counts(self, departments, start, today, end):
+        """(overdue, upcoming) counts of open plans with start <= Plazo < end, split at `today`."""
+        where, params = self.deadline_where(departments, start, end)
+        with self.connection() as conn:
+            overdue, upcoming = conn.execute(
+                f'SELECT COALESCE(SUM("Plazo" < ?), 0), COALESCE(SUM("Plazo" >= ?), 0) FROM action_plans{where}',
+                [pd.Timestamp(today).strftime(self.DATE_FORMAT)] * 2 + params
+            ).fetchone()
+        return overdue, upcoming
+
+    def status_counts(self, departments=None, start=None, end=None):
+        """Number of plans per Estado matching the filters, as an Estado/count frame."""
+        where, params = self.where(departments, start, end)
+        with self.connection() as conn:
+            return pd.read_sql_query(
+                f'SELECT "Estado", COUNT(*) AS count FROM action_plans{where} GROUP BY "Estado" ORDER BY count DESC',
+                conn, params=params
+            )
+
+    def count(self, departments=None, start=None, end=None, states=None):
+        where, params = self.where(departments, start, end, states)
+        with self.connection() as conn:
+            return conn.execute(f'SELECT COUNT(*) FROM action_plans{where}', params).fetchone()[0]
+
+@st.cache_resource(show_spinner=False)
+def open_action_plan_store(path, fingerprint):
+    """Open the action plan store once per process, seeding it from the data source when empty."""
+    store = ActionPlanStore(path)
+    plans, _ = load_action_plans(fingerprint)
+    store.seed(plans)
+    return store
+
+def action_plan_store():
+    # Plans have their own fingerprint so editing them never rebuilds the metric store
+    return open_action_plan_store(PLANS_DB, source_fingerprint(('action_plans',)))
 
 # Load data
-nom_df, lean_df, bienestar_df, _ = load_data()
+nom_df, lean_df, bienestar_df = load_data()
 if any(df is None for df in (nom_df, lean_df, bienestar_df)):
     logger.error("One or more DataFrames are None")
     st.error("No se pudieron cargar los datos.", icon="🚨")
@@ -328,9 +1378,17 @@ if any(df is None for df in (nom_df, lean_df, bienestar_df)):
 
 # ========== HELPER FUNCTIONS ==========
 def filter_dataframe(df, departamentos_filtro, start_date, end_date, date_column='Mes'):
-    """Filter DataFrame by departments and date range, preserving datetime type and ensuring unique rows."""
+    """Filter DataFrame by departments and date range, preserving datetime type and ensuring unique rows.
+
+    `df` may also be the name of a shared store table, answered from its FrameIndex
+    (sorted and de-duplicated at load time); any other frame falls back to a boolean mask.
+    """
     try:
         logger.info(f"Filtering DataFrame with date_column={date_column}")
+        store = dataset_store()
+        table = df if isinstance(df, str) else None
+        if table is not None:
+            df = store.frames[table]
         if df.empty or date_column not in df.columns:
             logger.warning(f"DataFrame is empty or {date_column} not in columns")
             return pd.DataFrame(columns=df.columns)
@@ -339,27 +1397,36 @@ def filter_dataframe(df, departamentos_filtro, start_date, end_date, date_column
         start_date = pd.Timestamp(start_date)
         end_date = pd.Timestamp(end_date)
         
-        # Convert date_column to datetime64
-        df = df.copy()
-        df[date_column] = pd.to_datetime(df[date_column], errors='coerce')
-        logger.info(f"{date_column} dtype after conversion: {df[date_column].dtype}")
-        
-        # Remove duplicates based on Departamento and date_column
-        if 'Departamento' in df.columns:
-            df = df.drop_duplicates(subset=['Departamento', date_column], keep='last')
+        index = store.index_for(table, date_column) if table is not None else None
+        if index is not None:
+            # Results come back in block order, so the department set (not its order) is the key
+            key = (store.version_of(table), tuple(sorted(departamentos_filtro or [])), start_date, end_date, date_column)
+            cache = get_filter_cache()
+            filtered_df = cache.get(key)
+            if filtered_df is None:
+                filtered_df = index.select(df, departamentos_filtro, start_date, end_date)
+                cache.put(key, filtered_df)
         else:
-            df = df.drop_duplicates(subset=[date_column], keep='last')
-        logger.info(f"Duplicates removed, DataFrame shape: {df.shape}")
-        
-        # Filter
-        mask = (
-            (df[date_column] >= start_date) & 
-            (df[date_column] <= end_date)
-        )
-        if 'Departamento' in df.columns and departamentos_filtro:
-            mask &= df['Departamento'].isin(departamentos_filtro)
-        
-        filtered_df = df[mask]
+            # Convert date_column to datetime64, copying only when needed
+            if not pd.api.types.is_datetime64_any_dtype(df[date_column]):
+                df = df.assign(**{date_column: pd.to_datetime(df[date_column], errors='coerce')})
+                logger.info(f"{date_column} dtype after conversion: {df[date_column].dtype}")
+            
+            # Remove duplicates based on Departamento and date_column, copying only if any exist
+            subset = ['Departamento', date_column] if 'Departamento' in df.columns else [date_column]
+            if df.duplicated(subset=subset, keep='last').any():
+                df = df.drop_duplicates(subset=subset, keep='last')
+                logger.info(f"Duplicates removed, DataFrame shape: {df.shape}")
+            
+            # Filter
+            mask = (
+                (df[date_column] >= start_date) & 
+                (df[date_column] <= end_date)
+            )
+            if 'Departamento' in df.columns and departamentos_filtro:
+                mask &= df['Departamento'].isin(departamentos_filtro)
+            
+            filtered_df = df[mask]
         
         if filtered_df.empty:
             logger.warning("Filtered DataFrame is empty")
@@ -372,8 +1439,216 @@ def filter_dataframe(df, departamentos_filtro, start_date, end_date, date_column
         st.warning(f"Error al filtrar datos: {e}", icon="🚨")
         return pd.DataFrame(columns=df.columns)
 
+# ========== DOWNSAMPLING ==========
+# Time series are thinned with Largest-Triangle-Three-Buckets before plotting, keeping
+# about POINTS_PER_PX points per pixel of the approximate rendered chart width
+CHART_WIDTH_PX = int(os.environ.get('DASHBOARD_CHART_WIDTH_PX', 800))
+POINTS_PER_PX = float(os.environ.get('DASHBOARD_POINTS_PER_PX', 1.0))
+
+def point_budget(facet_columns=1):
+    """Points per series a chart split into `facet_columns` columns can usefully show."""
+    return max(int(CHART_WIDTH_PX * POINTS_PER_PX / facet_columns), 3)
+
+# Line charts switch from SVG to WebGL traces once a facet holds more points than this
+WEBGL_THRESHOLD = int(os.environ.get('DASHBOARD_WEBGL_THRESHOLD', 2000))
+
+def render_mode(n_points, facets=1):
+    """'webgl' when a facet of the chart holds more than WEBGL_THRESHOLD points, else 'svg'."""
+    return 'webgl' if n_points / max(facets, 1) > WEBGL_THRESHOLD else 'svg'
+
+def lttb_indices(x, y, n_out):
+    """Positions of the points Largest-Triangle-Three-Buckets keeps from (x, y), in order.
+
+    The first and last points are always kept; the interior is split into n_out - 2
+    buckets, and each bucket keeps the point forming the largest triangle with the
+    previously kept point and the mean of the next bucket.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x).astype(np.float64)
+    x = x - x[0]
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    cum_x = np.concatenate([[0.0], np.cumsum(x)])
+    cum_y = np.concatenate([[0.0], np.cumsum(y)])
+    sizes = np.diff(edges)
+    mean_x = (cum_x[edges[1:]] - cum_x[edges[:-1]]) / sizes
+    mean_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / sizes
+    # The last bucket looks ahead to the final point instead of a bucket mean
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def downsample_wide(wide_df, columns, budget, x='Mes'):
+    """Thin a wide frame to the union of the LTTB points of each column, so traces share x."""
+    if len(wide_df) <= budget:
+        return wide_df
+    x_values = wide_df[x].to_numpy()
+    keep = np.unique(np.concatenate([
+        lttb_indices(x_values, wide_df[column].to_numpy(), budget) for column in columns
+    ]))
+    return wide_df.iloc[keep]
+
+def zoom_window(start_date, end_date, key):
+    """Date-range slider narrowing a time-series chart within the filtered period.
+
+    Narrower windows hold fewer points per series, so zooming in brings the chart back
+    to full resolution. The slider is re-created whenever the filtered period changes.
+    """
+    if start_date >= end_date:
+        return start_date, end_date
+    return st.slider(
+        "🔎 Zoom",
+        min_value=start_date,
+        max_value=end_date,
+        value=(start_date, end_date),
+        format="DD/MM/YYYY",
+        key=f"{key}_{start_date}_{end_date}"
+    )
+
+def downsampling_caption(fig):
+    """Note under a chart whose series were thinned, from the counts its builder put in layout.meta."""
+    meta = fig.layout.meta
+    if meta and meta['shown'] < meta['total']:
+        st.caption(f"Mostrando {meta['shown']:,} de {meta['total']:,} puntos; acerque el zoom para ver la resolución completa.")
+
+# Multi-department charts draw the TOP_N best and worst departments and fold the rest
+# into an aggregate once more than 2 * TOP_N are selected, so their cost stays bounded
+TOP_N = int(os.environ.get('DASHBOARD_TOP_N', 5))
+
+def rank_split(scores, top_n=TOP_N):
+    """Positions of the top_n highest and lowest scores and of the rest, in descending order.
+
+    With at most 2 * top_n scores every position is returned as top, in original order.
+    """
+    if len(scores) <= 2 * top_n:
+        return np.arange(len(scores)), np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    order = np.argsort(-scores, kind='stable')
+    return order[:top_n], order[-top_n:], order[top_n:-top_n]
+
+def performance_scores(values, metrics):
+    """Per-row mean of the min-max scaled metric columns, higher meaning better.
+
+    Metrics in LOWER_IS_BETTER are inverted before averaging.
+    """
+    scaled = min_max_scale(np.nan_to_num(values))
+    inverted = np.isin(metrics, list(LOWER_IS_BETTER))
+    scaled[:, inverted] = 1 - scaled[:, inverted]
+    return scaled.mean(axis=1)
+
+# Chart values are rounded to CHART_DECIMALS and, on Plotly >= 6 (which ships numpy
+# arrays as base64 typed arrays), sent as float32
+CHART_DECIMALS = int(os.environ.get('DASHBOARD_CHART_DECIMALS', 2))
+
+def compact_values(values):
+    """Chart-ready copy of `values` that serializes compactly with the installed Plotly."""
+    values = np.round(np.asarray(values, dtype=np.float64), CHART_DECIMALS)
+    if int(timed_import('plotly').__version__.split('.')[0]) >= 6:
+        return values.astype(np.float32)
+    return values
+
+def date_labels(dates):
+    """Dates as short ISO strings, without the time Plotly appends to datetime64 arrays."""
+    return np.datetime_as_string(np.asarray(dates, dtype='datetime64[ns]'), unit='D')
+
+def build_line_facets(cube, departments, metrics, start, end, target, value_label, columns=2):
+    """Per-department line chart with one facet per metric, straight from a MetricCube.
+
+    Series are read as arrays from the cube, thinned with LTTB and sent as compact
+    numbers, with department names once per trace instead of once per point. Past
+    2 * TOP_N departments only the best and worst are drawn and the rest become a
+    p25-p75 band per facet. Returns None when the selection has no data.
+    """
+    sums, counts, rows, periods = cube.cells(departments, metrics, start, end)
+    present = counts.sum(axis=(1, 2)) > 0
+    if not present.any():
+        return None
+    sums, counts, rows = sums[present], counts[present], rows[present]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+        window_means = sums.sum(axis=1) / counts.sum(axis=1)
+    names = [cube.departments[i] for i in rows]
+    dates = cube.periods[periods]
+    labels = date_labels(dates)
+    x_values = dates.astype('datetime64[ns]').astype(np.int64)
+    top, bottom, rest = rank_split(performance_scores(window_means, metrics))
+    drawn = np.concatenate([top, bottom])
+    budget = point_budget(facet_columns=columns)
+    n_points = min(len(dates), budget) * (len(drawn) + 2 * bool(len(rest))) * len(metrics)
+    trace_type = go.Scattergl if render_mode(n_points, facets=len(metrics)) == 'webgl' else go.Scatter
+    colors = [COLOR_PALETTE['primary'], COLOR_PALETTE['secondary'], COLOR_PALETTE['accent']]
+
+    fig = subplots.make_subplots(
+        rows=-(-len(metrics) // columns),
+        cols=min(columns, len(metrics)),
+        subplot_titles=metrics,
+        shared_xaxes='all',
+        shared_yaxes='all',
+        vertical_spacing=0.15,
+        horizontal_spacing=0.05
+    )
+    shown = 0
+    for j, metric in enumerate(metrics):
+        row, col = j // columns + 1, j % columns + 1
+        if len(rest):
+            p25, p75 = np.nanpercentile(means[rest, :, j], [25, 75], axis=0)
+            valid = np.flatnonzero(~np.isnan(p25))
+            keep = valid[lttb_indices(x_values[valid], (p25[valid] + p75[valid]) / 2, budget)]
+            shown += 2 * len(keep)
+            fig.add_trace(trace_type(
+                x=labels[keep], y=compact_values(p75[keep]), mode='lines', line=dict(width=0),
+                legendgroup='rest', showlegend=False, hoverinfo='skip'
+            ), row=row, col=col)
+            fig.add_trace(trace_type(
+                x=labels[keep], y=compact_values(p25[keep]), mode='lines', line=dict(width=0),
+                fill='tonexty', fillcolor='rgba(107, 114, 128, 0.25)',
+                name=f"Resto p25–p75 ({len(rest)})", legendgroup='rest', showlegend=j == 0, hoverinfo='skip'
+            ), row=row, col=col)
+        for k, position in enumerate(drawn):
+            y = means[position, :, j]
+            valid = np.flatnonzero(~np.isnan(y))
+            keep = valid[lttb_indices(x_values[valid], y[valid], budget)]
+            shown += len(keep)
+            fig.add_trace(trace_type(
+                x=labels[keep],
+                y=compact_values(y[keep]),
+                mode='lines',
+                name=names[position],
+                legendgroup=names[position],
+                showlegend=j == 0,
+                line=dict(color=colors[k % len(colors)], dash='dot' if position in bottom else 'solid')
+            ), row=row, col=col)
+        fig.add_hline(
+            y=target,
+            line_dash="dash",
+            line_color=COLOR_PALETTE['warning'],
+            annotation_text="Meta",
+            row=row,
+            col=col
+        )
+    fig.update_yaxes(range=[0, 100])
+    fig.update_yaxes(title_text=value_label, col=1)
+    fig.update_layout(
+        height=400,
+        legend_title_text='Departamento',
+        margin=dict(l=20, r=20, t=40, b=20),
+        font=dict(family="Inter", size=12),
+        hovermode="x unified",
+        meta={'shown': shown, 'total': int((counts > 0).sum())}
+    )
+    return fig
+
 # ========== SIDEBAR ==========
-def render_sidebar():
+def render_sidebar(departments, min_date, max_date):
     with st.sidebar:
         logger.info("Rendering sidebar")
         st.markdown("""
@@ -388,24 +1663,24 @@ def render_sidebar():
             st.markdown("**Período**")
             col1, col2 = st.columns(2)
             with col1:
-                default_start = date(2022, 1, 1)
+                default_start = min_date
                 start_date = st.date_input(
                     "Inicio",
                     value=default_start,
-                    min_value=date(2022, 1, 1),
-                    max_value=date(2025, 12, 31),
+                    min_value=min_date,
+                    max_value=max_date,
                     key="sidebar_date_start",
                     format="DD/MM/YYYY"
                 )
                 logger.info(f"Start date selected: {start_date}")
             with col2:
-                default_end = date(2025, 12, 31)
-                min_end_date = start_date if start_date >= date(2022, 1, 1) else default_start
+                default_end = max_date
+                min_end_date = start_date if start_date >= min_date else default_start
                 end_date = st.date_input(
                     "Fin",
                     value=default_end,
                     min_value=min_end_date,
-                    max_value=date(2025, 12, 31),
+                    max_value=max_date,
                     key="sidebar_date_end",
                     format="DD/MM/YYYY"
                 )
@@ -419,36 +1694,41 @@ def render_sidebar():
             st.markdown("**Departamentos**")
             departamentos_filtro = st.multiselect(
                 "Seleccionar departamentos",
-                options=DEPARTMENTS,
-                default=['Producción', 'Calidad', 'Logística'],
+                options=departments,
+                default=[d for d in ['Producción', 'Calidad', 'Logística'] if d in departments],
                 key="sidebar_dept_filter"
             )
             
             st.markdown("**Métricas**")
             nom_metrics = st.multiselect(
                 "Métricas NOM-035",
-                ['Evaluaciones', 'Capacitaciones', 'Incidentes', 'Satisfacción Laboral'],
+                NOM_METRICS,
                 default=['Evaluaciones', 'Capacitaciones'],
                 key="sidebar_nom_metrics"
             )
             lean_metrics = st.multiselect(
                 "Métricas LEAN",
-                ['Eficiencia', 'Reducción MURI/MURA/MUDA', 'Proyectos Activos', '5S+2_Score', 'Kaizen Colectivo', 'Tiempo Ciclo'],
+                LEAN_METRICS,
                 default=['Eficiencia', '5S+2_Score'],
                 key="sidebar_lean_metrics"
             )
         
         with st.expander("⚙️ Metas", expanded=False):
-            st.markdown("**Establecer Metas**")
-            nom_target = st.slider("Meta NOM-035 (%)", 50, 100, 90)
-            lean_target = st.slider("Meta LEAN (%)", 50, 100, 80)
-            wellbeing_target = st.slider("Meta Bienestar (%)", 50, 100, 85)
-            efficiency_target = st.slider("Meta Eficiencia (%)", 50, 100, 75)
+            # Targets feed the KPI cards and every tab, so they are applied together
+            # from a form instead of rerunning the script on each slider movement
+            with st.form("sidebar_targets_form", border=False):
+                st.markdown("**Establecer Metas**")
+                nom_target = st.slider("Meta NOM-035 (%)", 50, 100, 90)
+                lean_target = st.slider("Meta LEAN (%)", 50, 100, 80)
+                wellbeing_target = st.slider("Meta Bienestar (%)", 50, 100, 85)
+                efficiency_target = st.slider("Meta Eficiencia (%)", 50, 100, 75)
+                st.form_submit_button("✔️ Aplicar metas", use_container_width=True)
         
         st.markdown("---")
         if st.button("🔄 Actualizar", use_container_width=True):
             logger.info("Clearing cache and rerunning app")
             st.cache_data.clear()
+            st.cache_resource.clear()
             st.rerun()
         
         st.markdown("---")
@@ -488,7 +1768,8 @@ def render_header(start_date, end_date):
 # ========== KPI CARDS ==========
 def kpi_card(value, title, target, icon, delta=None):
     logger.info(f"Rendering KPI card: {title}")
-    delta_value = delta if delta is not None else value - target
+    # Without a previous period to compare against, show the gap to target and say so
+    delta_value, delta_label = (delta, "vs periodo anterior") if delta is not None else (value - target, "vs meta")
     percentage = min(100, (value / target * 100)) if target != 0 else 0
     status = "✅" if value >= target else "⚠" if value >= target - 10 else "❌"
     color = COLOR_PALETTE['success'] if value >= target else COLOR_PALETTE['warning'] if value >= target - 10 else COLOR_PALETTE['danger']
@@ -504,7 +1785,7 @@ def kpi_card(value, title, target, icon, delta=None):
             {value:.1f}%
         </div>
         <div style="font-size: 0.8rem; color: var(--muted);">
-            Meta: {target}% • {delta_text}
+            Meta: {target}% • {delta_text} {delta_label}
         </div>
         <div class="progress-bar">
             <div class="progress-bar-fill" style="width: {percentage}%; background: {color};"></div>
@@ -513,7 +1794,137 @@ def kpi_card(value, title, target, icon, delta=None):
     """, unsafe_allow_html=True)
 
 # ========== TABS ==========
-def render_nom_tab(nom_df, departamentos_filtro, nom_target, start_date, end_date, nom_metrics):
+# Lazy mode renders only the selected tab/sub-view; DASHBOARD_LAZY_TABS=0 builds them all inside st.tabs
+LAZY_TABS = os.environ.get('DASHBOARD_LAZY_TABS', '1') == '1'
+
+# Fragments rerun only their own body when one of their widgets changes. Each
+# section below receives the filter state it reads as arguments, so a fragment
+# rerun reuses the values from the last full run. Releases before 1.33 have no
+# fragments at all and 1.33-1.36 only the experimental name; DASHBOARD_FRAGMENTS=0
+# falls back to whole-script reruns.
+_fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+FRAGMENTS = _fragment is not None and os.environ.get('DASHBOARD_FRAGMENTS', '1') == '1'
+
+def fragment(func):
+    """Run `func` as a Streamlit fragment when fragments are enabled."""
+    return _fragment(func) if FRAGMENTS else func
+
+def rerun_section():
+    """Rerun the enclosing fragment, or the whole script when that is not possible."""
+    if FRAGMENTS:
+        try:
+            st.rerun(scope="fragment")
+        except (TypeError, StreamlitAPIException):
+            # No scope argument before 1.37; a full run has no fragment to rerun
+            pass
+    st.rerun()
+
+def render_views(views, key):
+    """Render {label: callable} views as a tab strip.
+
+    In lazy mode the strip is a horizontal radio whose selection lives in session state
+    under `key`, and only the selected view's callable runs. Otherwise every view is
+    computed inside st.tabs, as the browser decides which one is visible.
+    """
+    labels = list(views)
+    if LAZY_TABS:
+        selected = st.radio("Vista", labels, horizontal=True, key=key, label_visibility="collapsed")
+        logger.info(f"Rendering view {selected!r} for {key}")
+        views[selected]()
+    else:
+        for tab, label in zip(st.tabs(labels), labels):
+            with tab:
+                views[label]()
+
+def render_trend_view(engine, departamentos_filtro, metrics, start_date, end_date, key):
+    """Year-over-year / quarter-over-quarter change bars and CAGR table from a TrendEngine."""
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        granularity = st.radio(
+            "Granularidad",
+            ["Anual (YoY)", "Trimestral (QoQ)"],
+            horizontal=True,
+            key=f"{key}_granularity"
+        )
+        freq = 'Y' if granularity.startswith("Anual") else 'Q'
+        period_label = TrendEngine.FREQUENCIES[freq]
+        with st.spinner("Cargando tendencias..."):
+            try:
+                logger.info(f"Rendering trends for {key} ({freq})")
+                def build_figure():
+                    labels, depts, change = engine.changes(freq, departamentos_filtro, metrics, start_date, end_date)
+                    if not len(labels):
+                        return None
+                    # Long form straight from the (department, bucket, metric) array, no melt
+                    n_depts, n_buckets, n_metrics = change.shape
+                    dept_names = ['Organización' if dept is None else dept for dept in depts]
+                    trend_data = pd.DataFrame({
+                        'Departamento': np.repeat(dept_names, n_buckets * n_metrics),
+                        period_label: np.tile(np.repeat(labels, n_metrics), n_depts),
+                        'Métrica': np.tile(metrics, n_depts * n_buckets),
+                        'Cambio': np.nan_to_num(change.ravel())
+                    })
+                    facet_rows = -(-n_buckets // 4)
+                    fig_trend = px.bar(
+                        trend_data,
+                        x='Departamento',
+                        y='Cambio',
+                        color='Métrica',
+                        barmode='group',
+                        facet_col=period_label,
+                        facet_col_wrap=4,
+                        color_discrete_sequence=[
+                            COLOR_PALETTE['primary'], COLOR_PALETTE['secondary'], COLOR_PALETTE['accent'],
+                            COLOR_PALETTE['success'], COLOR_PALETTE['warning'], COLOR_PALETTE['danger']
+                        ],
+                        labels={'Cambio': 'Cambio Anual (%)' if freq == 'Y' else 'Cambio Trimestral (%)'},
+                        height=max(400, 250 * facet_rows)
+                    )
+                    fig_trend.add_hline(
+                        y=0,
+                        line_dash="dash",
+                        line_color=COLOR_PALETTE['muted'],
+                        annotation_text="Neutral"
+                    )
+                    fig_trend.update_layout(
+                        title="Tendencia Anual" if freq == 'Y' else "Tendencia Trimestral",
+                        margin=dict(l=20, r=20, t=40, b=20),
+                        font=dict(family="Inter", size=12)
+                    )
+                    return fig_trend
+                fig_trend = cached_figure(f"trend:{key}", (freq, tuple(sorted(departamentos_filtro)), tuple(metrics), start_date, end_date), build_figure)
+                if fig_trend is None:
+                    st.warning("🚨 No hay datos para los filtros seleccionados.", icon="🚨")
+                    return
+                st.plotly_chart(fig_trend, use_container_width=True)
+            except Exception as e:
+                logger.error(f"Error rendering trends for {key}: {e}")
+                st.warning(f"Error al renderizar tendencias: {e}", icon="🚨")
+    
+    with col2:
+        st.markdown("**📊 Interpretación**")
+        st.markdown("""
+        <div class="card">
+            <p style="font-size: 0.8rem;"><span style="color: var(--success);">↑ Positivo:</span> Mejora</p>
+            <p style="font-size: 0.8rem;"><span style="color: var(--danger);">↓ Negativo:</span> Atención</p>
+            <p style="font-size: 0.8rem;"><span style="color: var(--warning);">→ Neutral:</span> Monitoreo</p>
+        </div>
+        """, unsafe_allow_html=True)
+        st.markdown("**📈 CAGR (%)**")
+        try:
+            depts, growth = engine.cagr(departamentos_filtro, metrics, start_date, end_date)
+            cagr_table = pd.DataFrame(
+                growth,
+                index=pd.Index(['Organización' if dept is None else dept for dept in depts], name='Departamento'),
+                columns=metrics
+            )
+            st.dataframe(cagr_table.style.format('{:+.1f}', na_rep='—'), use_container_width=True)
+        except Exception as e:
+            logger.error(f"Error rendering CAGR for {key}: {e}")
+            st.warning(f"Error al calcular CAGR: {e}", icon="🚨")
+
+@fragment
+def render_nom_tab(departamentos_filtro, nom_target, start_date, end_date, nom_metrics):
     logger.info("Rendering NOM-035 tab")
     st.markdown("#### 📋 Cumplimiento NOM-035")
     
@@ -522,90 +1933,69 @@ def render_nom_tab(nom_df, departamentos_filtro, nom_target, start_date, end_dat
         st.warning("🚨 Seleccione al menos una métrica NOM-035.", icon="🚨")
         return
     
-    filtered_nom = filter_dataframe(nom_df, departamentos_filtro, start_date, end_date)
+    nom_cube = metric_cube('nom')
     
-    if filtered_nom.empty:
-        logger.warning("Filtered NOM-035 DataFrame is empty")
+    if nom_cube.is_empty(departamentos_filtro, start_date, end_date):
+        logger.warning("No NOM-035 data for the selected filters")
         st.warning("🚨 No hay datos para los filtros seleccionados.", icon="🚨")
         return
     
-    nom_view1, nom_view2, nom_view3 = st.tabs(["📊 Métricas", "🔍 Mapa de Riesgo", "📈 Tendencias"])
-    
-    with nom_view1:
-        col1, col2 = st.columns([3, 2])
-        with col1:
-            with st.spinner("Cargando gráfico..."):
-                try:
-                    logger.info("Rendering NOM-035 line chart")
-                    grouped_data = filtered_nom.groupby(['Mes', 'Departamento'])[nom_metrics].mean().reset_index()
-                    melted_data = pd.melt(
-                        grouped_data, 
-                        id_vars=['Mes', 'Departamento'],
-                        value_vars=nom_metrics,
-                        var_name='Métrica',
-                        value_name='Valor'
-                    )
-                    fig = px.line(
-                        melted_data,
-                        x="Mes",
-                        y="Valor",
-                        color="Departamento",
-                        facet_col="Métrica",
-                        facet_col_wrap=2,
-                        color_discrete_sequence=[COLOR_PALETTE['primary'], COLOR_PALETTE['secondary'], COLOR_PALETTE['accent']],
-                        labels={'Valor': '%'},
-                        height=400
-                    )
-                    for i, metric in enumerate(nom_metrics):
-                        fig.add_hline(
-                            y=nom_target,
-                            line_dash="dash",
-                            line_color=COLOR_PALETTE['warning'],
-                            annotation_text="Meta",
-                            row=(i // 2) + 1,
-                            col=(i % 2) + 1
-                        )
-                    fig.update_layout(
-                        yaxis_range=[0, 100],
-                        legend_title_text='Departamento',
-                        margin=dict(l=20, r=20, t=40, b=20),
-                        font=dict(family="Inter", size=12),
-                        hovermode="x unified"
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                except Exception as e:
-                    logger.error(f"Error rendering NOM-035 line chart: {e}")
-                    st.warning(f"Error al renderizar gráfico: {e}", icon="🚨")
-        
-        with col2:
-            st.markdown("**📌 Resumen**")
+    render_views({
+        "📊 Métricas": lambda: render_nom_metrics_view(nom_cube, departamentos_filtro, nom_target, start_date, end_date, nom_metrics),
+        "🔍 Mapa de Riesgo": lambda: render_nom_risk_view(nom_cube, departamentos_filtro, start_date, end_date, nom_metrics),
+        "📈 Tendencias": lambda: render_trend_view(trend_engine('nom'), departamentos_filtro, nom_metrics, start_date, end_date, key="nom_trend")
+    }, key="nom_view")
+
+def render_nom_metrics_view(nom_cube, departamentos_filtro, nom_target, start_date, end_date, nom_metrics):
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        with st.spinner("Cargando gráfico..."):
             try:
-                summary_cols = [col for col in nom_metrics + ['Incidentes'] if col in filtered_nom.columns]
-                if summary_cols:
-                    summary = filtered_nom.groupby('Departamento')[summary_cols].mean().round(1)
-                    format_dict = {col: '{:.1f}' for col in summary_cols}
-                    st.dataframe(
-                        summary.style.format(format_dict).background_gradient(cmap='RdYlGn'),
-                        use_container_width=True,
-                        height=400
-                    )
+                logger.info("Rendering NOM-035 line chart")
+                zoom_start, zoom_end = zoom_window(start_date, end_date, key="nom_zoom")
+                fig = cached_figure(
+                    "nom_metrics",
+                    (tuple(sorted(departamentos_filtro)), tuple(nom_metrics), zoom_start, zoom_end, nom_target),
+                    lambda: build_line_facets(nom_cube, departamentos_filtro, nom_metrics, zoom_start, zoom_end, nom_target, '%')
+                )
+                if fig is None:
+                    st.warning("🚨 No hay datos para los filtros seleccionados.", icon="🚨")
                 else:
-                    st.info("ℹ️ No hay métricas disponibles.", icon="ℹ️")
+                    st.plotly_chart(fig, use_container_width=True)
+                    downsampling_caption(fig)
             except Exception as e:
-                logger.error(f"Error rendering NOM-035 summary: {e}")
-                st.warning(f"Error al renderizar resumen: {e}", icon="🚨")
-    
-    with nom_view2:
-        with st.spinner("Cargando mapa de riesgo..."):
-            try:
-                logger.info("Rendering NOM-035 risk heatmap")
-                scaler = MinMaxScaler()
-                metrics = [col for col in nom_metrics + ['Incidentes'] if col in filtered_nom.columns]
-                if not metrics:
-                    st.warning("🚨 No hay métricas para el mapa de riesgo.", icon="🚨")
-                    return
-                risk_data = filtered_nom.groupby('Departamento')[metrics].mean()
-                z_values = scaler.fit_transform(risk_data)
+                logger.error(f"Error rendering NOM-035 line chart: {e}")
+                st.warning(f"Error al renderizar gráfico: {e}", icon="🚨")
+
+    with col2:
+        st.markdown("**📌 Resumen**")
+        try:
+            summary_cols = [col for col in nom_metrics + ['Incidentes'] if col in nom_cube.metrics]
+            if summary_cols:
+                summary = nom_cube.department_means(departamentos_filtro, summary_cols, start_date, end_date).round(1)
+                format_dict = {col: '{:.1f}' for col in summary_cols}
+                st.dataframe(
+                    summary.style.format(format_dict).background_gradient(cmap='RdYlGn'),
+                    use_container_width=True,
+                    height=400
+                )
+            else:
+                st.info("ℹ️ No hay métricas disponibles.", icon="ℹ️")
+        except Exception as e:
+            logger.error(f"Error rendering NOM-035 summary: {e}")
+            st.warning(f"Error al renderizar resumen: {e}", icon="🚨")
+
+def render_nom_risk_view(nom_cube, departamentos_filtro, start_date, end_date, nom_metrics):
+    with st.spinner("Cargando mapa de riesgo..."):
+        try:
+            logger.info("Rendering NOM-035 risk heatmap")
+            metrics = [col for col in nom_metrics + ['Incidentes'] if col in nom_cube.metrics]
+            if not metrics:
+                st.warning("🚨 No hay métricas para el mapa de riesgo.", icon="🚨")
+                return
+            def build_figure():
+                risk_data = nom_cube.department_means(departamentos_filtro, metrics, start_date, end_date)
+                z_values = min_max_scale(risk_data)
                 fig_heat = go.Figure(data=go.Heatmap(
                     z=z_values.T,
                     x=risk_data.index,
@@ -621,81 +2011,22 @@ def render_nom_tab(nom_df, departamentos_filtro, nom_target, start_date, end_dat
                     margin=dict(l=40, r=40, t=50, b=40),
                     font=dict(family="Inter", size=12)
                 )
-                st.plotly_chart(fig_heat, use_container_width=True)
-                st.markdown("""
-                <div class="card">
-                    <p style="font-size: 0.8rem;">
-                        <strong>Interpretación:</strong> Valores altos en métricas positivas indican buen cumplimiento.
-                    </p>
-                </div>
-                """, unsafe_allow_html=True)
-            except Exception as e:
-                logger.error(f"Error rendering NOM-035 heatmap: {e}")
-                st.warning(f"Error al renderizar mapa de riesgo: {e}", icon="🚨")
-    
-    with nom_view3:
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            with st.spinner("Cargando tendencias..."):
-                try:
-                    logger.info("Rendering NOM-035 trends bar chart")
-                    trend_data = filtered_nom.copy()
-                    logger.info(f"Trend data Mes dtype: {trend_data['Mes'].dtype}")
-                    
-                    # Ensure Mes is datetime64
-                    if not pd.api.types.is_datetime64_any_dtype(trend_data['Mes']):
-                        logger.warning("Mes column is not datetime64, attempting to convert")
-                        trend_data['Mes'] = pd.to_datetime(trend_data['Mes'], errors='coerce')
-                        if trend_data['Mes'].isna().all():
-                            raise ValueError("No se pudo convertir la columna Mes a datetime")
-                    
-                    trend_data['Año'] = trend_data['Mes'].dt.year
-                    trend_data = trend_data.groupby(['Departamento', 'Año'])[nom_metrics].mean().groupby('Departamento').pct_change().reset_index()
-                    trend_data = trend_data.fillna(0)
-                    melted_trend = pd.melt(
-                        trend_data,
-                        id_vars=['Departamento', 'Año'],
-                        value_vars=nom_metrics,
-                        var_name='Métrica',
-                        value_name='Cambio'
-                    )
-                    fig_trend = px.bar(
-                        melted_trend,
-                        x='Departamento',
-                        y='Cambio',
-                        color='Métrica',
-                        facet_col='Año',
-                        color_discrete_sequence=[COLOR_PALETTE['primary'], COLOR_PALETTE['secondary']],
-                        labels={'Cambio': 'Cambio Anual (%)'},
-                        height=400
-                    )
-                    fig_trend.add_hline(
-                        y=0,
-                        line_dash="dash",
-                        line_color=COLOR_PALETTE['muted'],
-                        annotation_text="Neutral"
-                    )
-                    fig_trend.update_layout(
-                        title="Tendencia Anual",
-                        margin=dict(l=20, r=20, t=40, b=20),
-                        font=dict(family="Inter", size=12)
-                    )
-                    st.plotly_chart(fig_trend, use_container_width=True)
-                except Exception as e:
-                    logger.error(f"Error rendering NOM-035 trends: {e}")
-                    st.warning(f"Error al renderizar tendencias: {e}", icon="🚨")
-        
-        with col2:
-            st.markdown("**📊 Interpretación**")
+                return fig_heat
+            fig_heat = cached_figure("nom_risk", (tuple(sorted(departamentos_filtro)), tuple(metrics), start_date, end_date), build_figure)
+            st.plotly_chart(fig_heat, use_container_width=True)
             st.markdown("""
             <div class="card">
-                <p style="font-size: 0.8rem;"><span style="color: var(--success);">↑ Positivo:</span> Mejora</p>
-                <p style="font-size: 0.8rem;"><span style="color: var(--danger);">↓ Negativo:</span> Atención</p>
-                <p style="font-size: 0.8rem;"><span style="color: var(--warning);">→ Neutral:</span> Monitoreo</p>
+                <p style="font-size: 0.8rem;">
+                    <strong>Interpretación:</strong> Valores altos en métricas positivas indican buen cumplimiento.
+                </p>
             </div>
             """, unsafe_allow_html=True)
+        except Exception as e:
+            logger.error(f"Error rendering NOM-035 heatmap: {e}")
+            st.warning(f"Error al renderizar mapa de riesgo: {e}", icon="🚨")
 
-def render_lean_tab(lean_df, departamentos_filtro, lean_target, start_date, end_date, lean_metrics):
+@fragment
+def render_lean_tab(departamentos_filtro, lean_target, start_date, end_date, lean_metrics):
     logger.info("Rendering LEAN tab")
     st.markdown("#### 🔄 Progreso LEAN 2.0")
     
@@ -704,53 +2035,35 @@ def render_lean_tab(lean_df, departamentos_filtro, lean_target, start_date, end_
         st.warning("🚨 Seleccione al menos una métrica LEAN.", icon="🚨")
         return
     
-    filtered_lean = filter_dataframe(lean_df, departamentos_filtro, start_date, end_date)
+    lean_cube = metric_cube('lean')
     
-    if filtered_lean.empty:
-        logger.warning("Filtered LEAN DataFrame is empty")
+    if lean_cube.is_empty(departamentos_filtro, start_date, end_date):
+        logger.warning("No LEAN data for the selected filters")
         st.warning("🚨 No hay datos para los filtros seleccionados.", icon="🚨")
         return
     
+    render_views({
+        "📊 Métricas": lambda: render_lean_metrics_view(lean_cube, departamentos_filtro, lean_target, start_date, end_date, lean_metrics),
+        "📈 Tendencias": lambda: render_trend_view(trend_engine('lean'), departamentos_filtro, lean_metrics, start_date, end_date, key="lean_trend")
+    }, key="lean_view")
+
+def render_lean_metrics_view(lean_cube, departamentos_filtro, lean_target, start_date, end_date, lean_metrics):
     col1, col2 = st.columns([3, 2])
     with col1:
         with st.spinner("Cargando gráfico..."):
             try:
                 logger.info("Rendering LEAN line chart")
-                grouped_data = filtered_lean.groupby(['Mes', 'Departamento'])[lean_metrics].mean().reset_index()
-                melted_data = pd.melt(
-                    grouped_data, 
-                    id_vars=['Mes', 'Departamento'],
-                    value_vars=lean_metrics,
-                    var_name='Métrica',
-                    value_name='Valor'
-                )
-                fig_lean = px.line(
-                    melted_data,
-                    x='Mes',
-                    y='Valor',
-                    color="Departamento",
-                    facet_col="Métrica",
-                    facet_col_wrap=2,
-                    color_discrete_sequence=[COLOR_PALETTE['primary'], COLOR_PALETTE['secondary'], COLOR_PALETTE['accent']],
-                    labels={'Valor': 'Valor'},
-                    height=400
-                )
-                for i, metric in enumerate(lean_metrics):
-                    fig_lean.add_hline(
-                        y=lean_target,
-                        line_dash="dash",
-                        line_color=COLOR_PALETTE['warning'],
-                        annotation_text="Meta",
-                        row=(i // 2) + 1,
-                        col=(i % 2) + 1
-                    )
-                fig_lean.update_layout(
-                    yaxis_range=[0, 100],
-                    margin=dict(l=20, r=20, t=40, b=20),
-                    font=dict(family="Inter", size=12),
-                    hovermode="x unified"
+                zoom_start, zoom_end = zoom_window(start_date, end_date, key="lean_zoom")
+                fig_lean = cached_figure(
+                    "lean_metrics",
+                    (tuple(sorted(departamentos_filtro)), tuple(lean_metrics), zoom_start, zoom_end, lean_target),
+                    lambda: build_line_facets(lean_cube, departamentos_filtro, lean_metrics, zoom_start, zoom_end, lean_target, 'Valor')
                 )
-                st.plotly_chart(fig_lean, use_container_width=True)
+                if fig_lean is None:
+                    st.warning("🚨 No hay datos para los filtros seleccionados.", icon="🚨")
+                else:
+                    st.plotly_chart(fig_lean, use_container_width=True)
+                    downsampling_caption(fig_lean)
             except Exception as e:
                 logger.error(f"Error rendering LEAN line chart: {e}")
                 st.warning(f"Error al renderizar gráfico: {e}", icon="🚨")
@@ -758,25 +2071,46 @@ def render_lean_tab(lean_df, departamentos_filtro, lean_target, start_date, end_
         with st.spinner("Cargando análisis..."):
             try:
                 logger.info("Rendering LEAN 3D scatter plot")
-                grouped_lean = filtered_lean.groupby('Departamento')[lean_metrics].mean().reset_index()
-                metrics_3d = lean_metrics[:3]
-                if len(metrics_3d) < 3:
-                    metrics_3d += [lean_metrics[0]] * (3 - len(metrics_3d))
-                fig_scatter = px.scatter_3d(
-                    grouped_lean,
-                    x=metrics_3d[0],
-                    y=metrics_3d[1],
-                    z=metrics_3d[2],
-                    color='Departamento',
-                    size=np.ones(len(grouped_lean)) * 10,
-                    hover_name='Departamento',
-                    height=400
-                )
-                fig_scatter.update_layout(
-                    title="Análisis Multidimensional",
-                    margin=dict(l=20, r=20, t=40, b=20),
-                    font=dict(family="Inter", size=12)
-                )
+                def build_figure():
+                    means = lean_cube.department_means(departamentos_filtro, lean_metrics, start_date, end_date)
+                    metrics_3d = lean_metrics[:3]
+                    if len(metrics_3d) < 3:
+                        metrics_3d += [lean_metrics[0]] * (3 - len(metrics_3d))
+                    values = means[metrics_3d].to_numpy()
+                    names = means.index.to_numpy()
+                    top, bottom, rest = rank_split(performance_scores(means.to_numpy(), lean_metrics))
+                    hovertemplate = "<b>%{text}</b><br>" + "<br>".join(
+                        f"{metric}: %{{{axis}:.1f}}" for metric, axis in zip(metrics_3d, 'xyz')
+                    ) + "<extra></extra>"
+
+                    def markers(points, text, name, **marker):
+                        return go.Scatter3d(
+                            x=points[:, 0], y=points[:, 1], z=points[:, 2],
+                            mode='markers', name=name, text=text,
+                            hovertemplate=hovertemplate, marker=marker
+                        )
+
+                    if len(rest):
+                        # The folded departments become one marker at their mean
+                        rest_label = f"Resto ({len(rest)}, promedio)"
+                        traces = [
+                            markers(values[top], names[top], f"Top {len(top)}", size=7, color=COLOR_PALETTE['success']),
+                            markers(values[bottom], names[bottom], f"Bottom {len(bottom)}", size=7, color=COLOR_PALETTE['danger']),
+                            markers(np.nanmean(values[rest], axis=0, keepdims=True), [rest_label], rest_label, size=7, color=COLOR_PALETTE['muted'], symbol='diamond')
+                        ]
+                    else:
+                        traces = [markers(values[[position]], names[[position]], names[position], size=7) for position in range(len(names))]
+                    fig_scatter = go.Figure(traces)
+                    fig_scatter.update_layout(
+                        title="Análisis Multidimensional",
+                        scene=dict(xaxis_title=metrics_3d[0], yaxis_title=metrics_3d[1], zaxis_title=metrics_3d[2]),
+                        legend_title_text='Departamento',
+                        height=400,
+                        margin=dict(l=20, r=20, t=40, b=20),
+                        font=dict(family="Inter", size=12)
+                    )
+                    return fig_scatter
+                fig_scatter = cached_figure("lean_scatter", (tuple(sorted(departamentos_filtro)), tuple(lean_metrics), start_date, end_date), build_figure)
                 st.plotly_chart(fig_scatter, use_container_width=True)
             except Exception as e:
                 logger.error(f"Error rendering LEAN 3D scatter: {e}")
@@ -787,49 +2121,54 @@ def render_lean_tab(lean_df, departamentos_filtro, lean_target, start_date, end_
         with st.spinner("Cargando radar..."):
             try:
                 logger.info("Rendering LEAN radar chart")
-                scaler = MinMaxScaler()
-                lean_radar = filtered_lean.groupby('Departamento')[lean_metrics].mean().reset_index()
-                
-                # Ensure numeric data
-                lean_radar[lean_metrics] = lean_radar[lean_metrics].apply(pd.to_numeric, errors='coerce').fillna(0)
-                
-                if lean_radar[lean_metrics].isna().all().all():
-                    logger.warning("All LEAN metrics are NaN")
-                    st.warning("🚨 No hay datos válidos para el radar.", icon="🚨")
-                    return
-                
-                scaled_data = scaler.fit_transform(lean_radar[lean_metrics])
-                lean_radar[lean_metrics] = scaled_data
+                def build_figure():
+                    means = lean_cube.department_means(departamentos_filtro, lean_metrics, start_date, end_date)
+                    if means.empty:
+                        logger.warning("No valid data for radar chart")
+                        return None
+                    scaled = min_max_scale(np.nan_to_num(means.to_numpy()))
+                    names = means.index.to_numpy()
+                    top, bottom, rest = rank_split(performance_scores(means.to_numpy(), lean_metrics))
+                    # Repeat the first axis so every polygon closes
+                    theta = lean_metrics + lean_metrics[:1]
+                    closed = np.concatenate([scaled, scaled[:, :1]], axis=1)
                 
-                fig_radar = go.Figure()
-                for _, row in lean_radar.iterrows():
-                    values = [row[m] for m in lean_metrics]
-                    if np.isnan(values).any():
-                        logger.warning(f"Skipping {row['Departamento']} due to NaN values")
-                        continue
-                    fig_radar.add_trace(go.Scatterpolar(
-                        r=values,
-                        theta=lean_metrics,
-                        fill='toself',
-                        name=row['Departamento'],
-                        line=dict(width=2)
-                    ))
+                    fig_radar = go.Figure()
+                    if len(rest):
+                        p25, p75 = np.percentile(closed[rest], [25, 75], axis=0)
+                        fig_radar.add_trace(go.Scatterpolar(
+                            r=p75, theta=theta, mode='lines', line=dict(width=0),
+                            showlegend=False, hoverinfo='skip'
+                        ))
+                        fig_radar.add_trace(go.Scatterpolar(
+                            r=p25, theta=theta, mode='lines', line=dict(width=0),
+                            fill='tonext', fillcolor='rgba(107, 114, 128, 0.25)',
+                            name=f"Resto p25–p75 ({len(rest)})", hoverinfo='skip'
+                        ))
+                    for position in np.concatenate([top, bottom]):
+                        fig_radar.add_trace(go.Scatterpolar(
+                            r=closed[position],
+                            theta=theta,
+                            fill='toself' if not len(rest) else None,
+                            name=names[position],
+                            line=dict(width=2, dash='dot' if position in bottom else 'solid')
+                        ))
                 
-                if not fig_radar.data:
-                    logger.warning("No valid data for radar chart")
+                    fig_radar.update_layout(
+                        polar=dict(
+                            radialaxis=dict(visible=True, range=[0, 1], showticklabels=False),
+                            angularaxis=dict(tickfont_size=10)
+                        ),
+                        height=400,
+                        showlegend=True,
+                        margin=dict(l=40, r=40, t=20, b=40),
+                        font=dict(family="Inter", size=12)
+                    )
+                    return fig_radar
+                fig_radar = cached_figure("lean_radar", (tuple(sorted(departamentos_filtro)), tuple(lean_metrics), start_date, end_date), build_figure)
+                if fig_radar is None:
                     st.warning("🚨 No hay datos suficientes para el radar.", icon="🚨")
                     return
-                
-                fig_radar.update_layout(
-                    polar=dict(
-                        radialaxis=dict(visible=True, range=[0, 1], showticklabels=False),
-                        angularaxis=dict(tickfont_size=10)
-                    ),
-                    height=400,
-                    showlegend=True,
-                    margin=dict(l=40, r=40, t=20, b=40),
-                    font=dict(family="Inter", size=12)
-                )
                 st.plotly_chart(fig_radar, use_container_width=True)
             except Exception as e:
                 logger.error(f"Error rendering LEAN radar: {e}")
@@ -840,11 +2179,11 @@ def render_lean_tab(lean_df, departamentos_filtro, lean_target, start_date, end_
             try:
                 # Ensure unique columns
                 summary_cols = list(set(lean_metrics + ['Proyectos Activos'] if 'Proyectos Activos' not in lean_metrics else lean_metrics))
-                summary_cols = [col for col in summary_cols if col in filtered_lean.columns]
+                summary_cols = [col for col in summary_cols if col in lean_cube.metrics]
                 logger.info(f"Summary columns: {summary_cols}")
                 
                 if summary_cols:
-                    summary = filtered_lean.groupby('Departamento')[summary_cols].mean().round(1).reset_index()
+                    summary = lean_cube.department_means(departamentos_filtro, summary_cols, start_date, end_date).round(1).reset_index()
                     logger.info(f"Summary DataFrame index is unique: {summary.index.is_unique}, columns: {summary.columns.tolist()}")
                     
                     # Apply formatting only to numeric columns
@@ -868,9 +2207,11 @@ def render_lean_tab(lean_df, departamentos_filtro, lean_target, start_date, end_
                 logger.error(f"Error rendering LEAN summary: {e}")
                 st.warning(f"Error al renderizar detalle: {e}", icon="🚨")
 
-def render_wellbeing_tab(bienestar_df, start_date, end_date, wellbeing_target):
+@fragment
+def render_wellbeing_tab(start_date, end_date, wellbeing_target):
     logger.info("Rendering Wellbeing tab")
     st.markdown("#### 😊 Bienestar Organizacional")
+    bienestar_df = dataset_store().frames['bienestar']
     
     # Validate date range
     min_date = bienestar_df['Mes'].min().date()
@@ -879,7 +2220,7 @@ def render_wellbeing_tab(bienestar_df, start_date, end_date, wellbeing_target):
     end_date = min(end_date, max_date)
     logger.info(f"Adjusted date range: {start_date} to {end_date}")
     
-    filtered_bienestar = filter_dataframe(bienestar_df, [], start_date, end_date)
+    filtered_bienestar = filter_dataframe('bienestar', [], start_date, end_date)
     
     if filtered_bienestar.empty:
         logger.warning("Filtered Wellbeing DataFrame is empty, using full dataset")
@@ -925,28 +2266,38 @@ def render_wellbeing_tab(bienestar_df, start_date, end_date, wellbeing_target):
             logger.error(f"Error rendering Rotación metric: {e}")
             st.warning(f"Error: {e}", icon="🚨")
     
-    wellbeing_view1, wellbeing_view2 = st.tabs(["📈 Tendencias", "🔍 Correlaciones"])
-    
-    with wellbeing_view1:
-        with st.spinner("Cargando tendencias..."):
-            try:
-                logger.info("Rendering Wellbeing line chart")
-                metrics = [col for col in ['Índice Bienestar', 'Ausentismo', 'Rotación', 'Engagement'] if col in filtered_bienestar.columns]
-                if not metrics:
-                    logger.warning("No valid metrics for Wellbeing line chart")
-                    st.warning("🚨 No hay métricas disponibles.", icon="🚨")
-                    return
-                
-                filtered_bienestar[metrics] = filtered_bienestar[metrics].apply(pd.to_numeric, errors='coerce').fillna(0)
-                logger.info(f"Valid metrics: {metrics}")
-                
-                if len(filtered_bienestar) < 1:
-                    logger.warning("No valid data for Wellbeing line chart")
-                    st.warning("🚨 No hay datos válidos.", icon="🚨")
-                    return
-                
+    render_views({
+        "📈 Tendencias": lambda: render_wellbeing_trends_view(filtered_bienestar, start_date, end_date, wellbeing_target),
+        "🔍 Correlaciones": lambda: render_wellbeing_correlation_view(filtered_bienestar, start_date, end_date)
+    }, key="wellbeing_view")
+
+def render_wellbeing_trends_view(filtered_bienestar, start_date, end_date, wellbeing_target):
+    with st.spinner("Cargando tendencias..."):
+        try:
+            logger.info("Rendering Wellbeing line chart")
+            metrics = [col for col in ['Índice Bienestar', 'Ausentismo', 'Rotación', 'Engagement'] if col in filtered_bienestar.columns]
+            if not metrics:
+                logger.warning("No valid metrics for Wellbeing line chart")
+                st.warning("🚨 No hay métricas disponibles.", icon="🚨")
+                return
+
+            zoom_start, zoom_end = zoom_window(start_date, end_date, key="wellbeing_zoom")
+            if (zoom_start, zoom_end) != (start_date, end_date):
+                filtered_bienestar = filter_dataframe('bienestar', [], zoom_start, zoom_end)
+
+            # Filtered views are shared across sessions, so derive a new frame instead of writing into it
+            chart_data = filtered_bienestar[['Mes'] + metrics].fillna(0)
+            logger.info(f"Valid metrics: {metrics}")
+
+            if len(chart_data) < 1:
+                logger.warning("No valid data for Wellbeing line chart")
+                st.warning("🚨 No hay datos válidos.", icon="🚨")
+                return
+
+            def build_figure():
+                sampled = downsample_wide(chart_data, metrics, point_budget())
                 fig_bienestar = px.line(
-                    filtered_bienestar,
+                    sampled,
                     x='Mes',
                     y=metrics,
                     markers=True,
@@ -957,6 +2308,7 @@ def render_wellbeing_tab(bienestar_df, start_date, end_date, wellbeing_target):
                         COLOR_PALETTE['accent']
                     ],
                     labels={'value': '%', 'variable': 'Métrica'},
+                    render_mode=render_mode(len(sampled) * len(metrics)),
                     height=400
                 )
                 fig_bienestar.add_hline(
@@ -971,32 +2323,38 @@ def render_wellbeing_tab(bienestar_df, start_date, end_date, wellbeing_target):
                     legend_title="Métrica",
                     margin=dict(l=20, r=20, t=40, b=20),
                     font=dict(family="Inter", size=12),
-                    hovermode="x unified"
+                    hovermode="x unified",
+                    meta={'shown': len(sampled), 'total': len(chart_data)}
                 )
-                st.plotly_chart(fig_bienestar, use_container_width=True)
-            except Exception as e:
-                logger.error(f"Error rendering Wellbeing line chart: {e}")
-                st.warning(f"Error al renderizar tendencias: {e}", icon="🚨")
-    
-    with wellbeing_view2:
-        with st.spinner("Cargando correlaciones..."):
-            try:
-                logger.info("Rendering Wellbeing correlation matrix")
-                metrics = [col for col in ['Índice Bienestar', 'Ausentismo', 'Rotación', 'Encuestas', 'Engagement'] if col in filtered_bienestar.columns]
-                if len(metrics) < 2:
-                    logger.warning("Not enough metrics for correlation matrix")
-                    st.warning("🚨 No hay suficientes métricas.", icon="🚨")
-                    return
-                
-                filtered_bienestar[metrics] = filtered_bienestar[metrics].apply(pd.to_numeric, errors='coerce')
-                filtered_bienestar = filtered_bienestar.dropna(subset=metrics)
-                
-                if filtered_bienestar.empty:
-                    logger.warning("No valid data for correlation matrix")
-                    st.warning("🚨 No hay datos válidos.", icon="🚨")
-                    return
-                
-                corr_matrix = filtered_bienestar[metrics].corr()
+                return fig_bienestar
+            fig_bienestar = cached_figure("wellbeing_trends", (tuple(metrics), zoom_start, zoom_end, wellbeing_target), build_figure)
+            st.plotly_chart(fig_bienestar, use_container_width=True)
+            downsampling_caption(fig_bienestar)
+        except Exception as e:
+            logger.error(f"Error rendering Wellbeing line chart: {e}")
+            st.warning(f"Error al renderizar tendencias: {e}", icon="🚨")
+
+    render_trend_view(trend_engine('bienestar'), [], metrics, start_date, end_date, key="wellbeing_trend")
+
+def render_wellbeing_correlation_view(filtered_bienestar, start_date, end_date):
+    with st.spinner("Cargando correlaciones..."):
+        try:
+            logger.info("Rendering Wellbeing correlation matrix")
+            metrics = [col for col in ['Índice Bienestar', 'Ausentismo', 'Rotación', 'Encuestas', 'Engagement'] if col in filtered_bienestar.columns]
+            if len(metrics) < 2:
+                logger.warning("Not enough metrics for correlation matrix")
+                st.warning("🚨 No hay suficientes métricas.", icon="🚨")
+                return
+
+            corr_engine = correlation_engine('bienestar')
+            corr_matrix = corr_engine.matrix(start_date, end_date, metrics)
+
+            if corr_matrix.isna().all().all():
+                logger.warning("No valid data for correlation matrix")
+                st.warning("🚨 No hay datos válidos.", icon="🚨")
+                return
+
+            def build_figure():
                 fig_corr = px.imshow(
                     corr_matrix,
                     text_auto='.2f',
@@ -1010,116 +2368,364 @@ def render_wellbeing_tab(bienestar_df, start_date, end_date, wellbeing_target):
                     margin=dict(l=40, r=40, t=50, b=40),
                     font=dict(family="Inter", size=12)
                 )
-                st.plotly_chart(fig_corr, use_container_width=True)
-                st.markdown("""
-                <div class="card">
-                    <p style="font-size: 0.8rem;">
-                        <strong>Interpretación:</strong> Valores cercanos a 1 indican correlación positiva, -1 negativa, 0 ninguna.
-                    </p>
-                </div>
-                """, unsafe_allow_html=True)
-            except Exception as e:
-                logger.error(f"Error rendering Wellbeing correlation: {e}")
-                st.warning(f"Error al renderizar correlaciones: {e}", icon="🚨")
+                return fig_corr
+            fig_corr = cached_figure("wellbeing_correlation", (tuple(metrics), start_date, end_date), build_figure)
+            st.plotly_chart(fig_corr, use_container_width=True)
+            st.markdown("""
+            <div class="card">
+                <p style="font-size: 0.8rem;">
+                    <strong>Interpretación:</strong> Valores cercanos a 1 indican correlación positiva, -1 negativa, 0 ninguna.
+                </p>
+            </div>
+            """, unsafe_allow_html=True)
+        except Exception as e:
+            logger.error(f"Error rendering Wellbeing correlation: {e}")
+            st.warning(f"Error al renderizar correlaciones: {e}", icon="🚨")
+            return
 
+    render_lagged_correlation(corr_engine, metrics, start_date, end_date)
+
+def render_lagged_correlation(corr_engine, metrics, start_date, end_date):
+    st.markdown("**⏱️ Correlación con desfase**")
+    col1, col2 = st.columns(2)
+    with col1:
+        lead_metric = st.selectbox(
+            "Métrica en t",
+            metrics,
+            index=metrics.index('Engagement') if 'Engagement' in metrics else 0,
+            key="lag_lead_metric"
+        )
+    with col2:
+        follow_metric = st.selectbox(
+            "Métrica en t + desfase",
+            metrics,
+            index=metrics.index('Rotación') if 'Rotación' in metrics else min(1, len(metrics) - 1),
+            key="lag_follow_metric"
+        )
+    with st.spinner("Calculando desfases..."):
+        try:
+            logger.info(f"Rendering lagged correlation {lead_metric} -> {follow_metric}")
+            profile = corr_engine.lagged(lead_metric, follow_metric, start_date, end_date)
+            if np.isnan(profile).all():
+                st.info("ℹ️ No hay suficientes períodos para calcular desfases.", icon="ℹ️")
+                return
+            def build_figure():
+                lags = np.arange(len(profile))
+                fig_lag = go.Figure(go.Bar(
+                    x=lags,
+                    y=profile,
+                    marker_color=np.where(profile >= 0, COLOR_PALETTE['success'], COLOR_PALETTE['danger']),
+                    hovertemplate="Desfase %{x}: r = %{y:.2f}<extra></extra>"
+                ))
+                fig_lag.update_layout(
+                    title=f"{lead_metric} (t) vs {follow_metric} (t + desfase)",
+                    xaxis_title="Desfase (períodos)",
+                    yaxis_title="Correlación",
+                    yaxis_range=[-1, 1],
+                    height=300,
+                    margin=dict(l=40, r=40, t=50, b=40),
+                    font=dict(family="Inter", size=12)
+                )
+                return fig_lag
+            fig_lag = cached_figure("wellbeing_lag", (lead_metric, follow_metric, start_date, end_date), build_figure)
+            st.plotly_chart(fig_lag, use_container_width=True)
+            best = int(np.nanargmax(np.abs(profile)))
+            st.caption(f"Mayor relación con desfase de {best} períodos (r = {profile[best]:.2f}).")
+        except Exception as e:
+            logger.error(f"Error rendering lagged correlation: {e}")
+            st.warning(f"Error al calcular correlación con desfase: {e}", icon="🚨")
+
+PLAN_STATUS_LABELS = {'Pendiente': '🔴 Pendiente', 'En progreso': '🟡 En progreso', 'Completado': '🟢 Completado'}
+PLAN_PAGE_SIZES = [25, 50, 100]
+
+def reset_page(key):
+    """on_change callback sending a paginated view back to its first page."""
+    st.session_state[key] = 1
+
+def render_action_plans_grid(store, departamentos_filtro, start_date, end_date):
+    """Plans table sorted, filtered and paginated in SQL, so a rerun only reads one page."""
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
+    with col1:
+        states = st.multiselect("Estado", list(PLAN_STATUS_LABELS), key="plans_states", placeholder="Todos", on_change=reset_page, args=("plans_page",))
+    with col2:
+        order_by = st.selectbox("Ordenar por", ACTION_PLAN_COLUMNS, index=ACTION_PLAN_COLUMNS.index('Plazo'), key="plans_order_by", on_change=reset_page, args=("plans_page",))
+    with col3:
+        descending = st.toggle("Desc.", key="plans_descending", on_change=reset_page, args=("plans_page",))
+    with col4:
+        page_size = st.selectbox("Filas", PLAN_PAGE_SIZES, key="plans_page_size", on_change=reset_page, args=("plans_page",))
+    
+    try:
+        total = store.count(departamentos_filtro, start_date, end_date, states)
+        if not total:
+            logger.warning("No action plans for the selected filters")
+            st.info("ℹ️ No hay planes para los filtros seleccionados.", icon="ℹ️")
+            return
+        pages = -(-total // page_size)
+        # Clamp before the widget exists: a narrower filter can leave the stored page out of range
+        if st.session_state.get("plans_page", 1) > pages:
+            st.session_state["plans_page"] = pages
+        page = st.session_state.get("plans_page", 1)
+        plans = store.page(
+            departamentos_filtro, start_date, end_date, states,
+            order_by=order_by, descending=descending, limit=page_size, offset=(page - 1) * page_size
+        )
+        plans['Estado'] = plans['Estado'].map(PLAN_STATUS_LABELS).astype('category')
+        st.dataframe(
+            plans,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'ID': st.column_config.NumberColumn('ID', format="%d", width="small"),
+                'Plazo': st.column_config.DateColumn('Plazo', format="DD/MM/YYYY"),
+                '% Avance': st.column_config.ProgressColumn('% Avance', min_value=0, max_value=100, format="%d%%"),
+                'Costo Estimado': st.column_config.NumberColumn('Costo Estimado', format="MXN %d")
+            },
+            height=400
+        )
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            st.number_input("Página", min_value=1, max_value=pages, step=1, key="plans_page")
+        with col2:
+            first = (page - 1) * page_size + 1
+            st.caption(f"Planes {first:,}–{min(first + page_size - 1, total):,} de {total:,} · página {page} de {pages}")
+    except Exception as e:
+        logger.error(f"Error rendering Action Plans table: {e}")
+        st.warning(f"Error al renderizar planes: {e}", icon="🚨")
+
+DEADLINE_HORIZON_DAYS = 30
+DEADLINE_PAGE_SIZE = 5
+
+def render_deadlines_panel(store, departamentos_filtro, start_date, end_date):
+    """Overdue and upcoming open plans from the deadline index, one bounded page of cards at a time."""
+    try:
+        today = pd.Timestamp(date.today())
+        start = pd.Timestamp(start_date)
+        # Plazo holds times too, so the last day counts up to the following midnight
+        end = min(pd.Timestamp(end_date), today + pd.Timedelta(days=DEADLINE_HORIZON_DAYS)) + pd.Timedelta(days=1)
+        overdue, upcoming = store.deadline_counts(departamentos_filtro, start, today, end)
+        col1, col2 = st.columns(2)
+        col1.metric("Vencidos", f"{overdue:,}")
+        col2.metric(f"Próx. {DEADLINE_HORIZON_DAYS} días", f"{upcoming:,}")
+        
+        view = st.radio(
+            "Vencimientos", ["Próximos", "Vencidos"], horizontal=True, key="deadline_view",
+            label_visibility="collapsed", on_change=reset_page, args=("deadline_page",)
+        )
+        if view == "Próximos":
+            low, high, total = max(start, today), end, upcoming
+        else:
+            low, high, total = start, min(today, end), overdue
+        if not total:
+            st.info("ℹ️ No hay vencimientos próximos." if view == "Próximos" else "ℹ️ No hay planes vencidos.", icon="ℹ️")
+            return
+        
+        pages = -(-total // DEADLINE_PAGE_SIZE)
+        if st.session_state.get("deadline_page", 1) > pages:
+            st.session_state["deadline_page"] = pages
+        page = st.session_state.get("deadline_page", 1)
+        plans = store.deadlines(departamentos_filtro, low, high, DEADLINE_PAGE_SIZE, (page - 1) * DEADLINE_PAGE_SIZE)
+        days_left = (plans['Plazo'].dt.normalize() - today).dt.days.to_numpy()
+        for department, problem, days in zip(plans['Departamento'], plans['Problema'], days_left):
+            color = COLOR_PALETTE['danger'] if days < 7 else COLOR_PALETTE['warning']
+            text = f"Vence en {days} días" if days > 0 else "Vence hoy" if days == 0 else f"Vencido hace {-days} días"
+            st.markdown(f"""
+            <div class="card">
+                <div style="font-weight: 600;">{department}</div>
+                <div style="font-size: 0.8rem; color: var(--muted);">{problem[:30]}...</div>
+                <div style="font-size: 0.8rem; color: {color};">{text}</div>
+            </div>
+            """, unsafe_allow_html=True)
+        if pages > 1:
+            st.number_input("Página", min_value=1, max_value=pages, step=1, key="deadline_page")
+            st.caption(f"{total:,} planes · página {page} de {pages}")
+    except Exception as e:
+        logger.error(f"Error rendering deadlines: {e}")
+        st.warning(f"Error al renderizar vencimientos: {e}", icon="🚨")
+
+PLAN_PRIORITIES = ['Alta', 'Media', 'Baja']
+PLAN_TEXT_LIMIT = 200
+# Columns an import file must carry; Estado is optional and otherwise derived from % Avance
+PLAN_IMPORT_COLUMNS = [col for col in ACTION_PLAN_COLUMNS if col not in ('ID', 'Estado')]
+# Letters (accented included) separated by spaces
+PLAN_OWNER_PATTERN = r'[^\W\d_]+(?:\s+[^\W\d_]+)*'
+
+def plan_departments():
+    """Departments a plan may belong to: the standard list, then any other found in the data."""
+    return DEPARTMENTS + [dept for dept in dataset_store().frames['nom']['Departamento'].cat.categories if dept not in DEPARTMENTS]
+
+def plan_status(avance):
+    """Estado implied by a progress percentage."""
+    return np.select([avance <= 0, avance < 100], ['Pendiente', 'En progreso'], 'Completado')
+
+def validate_plans(plans, departments, today):
+    """Validate plans column by column and report every problem of every row in one pass.
+
+    Returns the valid rows in store columns and a frame with the spreadsheet row (header
+    on row 1) and the joined error messages of each rejected row.
+    """
+    missing = [col for col in PLAN_IMPORT_COLUMNS if col not in plans.columns]
+    if missing:
+        raise ValueError(f"Faltan columnas: {', '.join(missing)}")
+    plans = plans.reset_index(drop=True)
+    text = {
+        col: plans[col].fillna('').astype(str).str.strip()
+        for col in ('Departamento', 'Problema', 'Acción', 'Responsable', 'Prioridad')
+    }
+    plazo = pd.to_datetime(plans['Plazo'], errors='coerce', format='ISO8601')
+    retry = plazo.isna() & plans['Plazo'].notna()
+    if retry.any():
+        plazo[retry] = pd.to_datetime(plans.loc[retry, 'Plazo'].astype(str), errors='coerce', format='%d/%m/%Y')
+    avance = pd.to_numeric(plans['% Avance'], errors='coerce')
+    costo = pd.to_numeric(plans['Costo Estimado'], errors='coerce')
+    # Estado follows from the stored (rounded) % Avance; an explicit one must agree with it
+    derived = pd.Series(plan_status(avance.round().fillna(0).to_numpy()), index=plans.index)
+    estado = plans['Estado'].fillna('').astype(str).str.strip() if 'Estado' in plans.columns else pd.Series('', index=plans.index)
+    estado = estado.mask(estado == '', derived)
+    owner = text['Responsable']
+    rules = [
+        (~text['Departamento'].isin(departments), "Departamento no válido"),
+        (text['Problema'] == '', "Problema es obligatorio"),
+        (text['Problema'].str.len() > PLAN_TEXT_LIMIT, f"Problema no puede exceder {PLAN_TEXT_LIMIT} caracteres"),
+        (text['Acción'] == '', "Acción es obligatoria"),
+        (text['Acción'].str.len() > PLAN_TEXT_LIMIT, f"Acción no puede exceder {PLAN_TEXT_LIMIT} caracteres"),
+        (owner == '', "Responsable es obligatorio"),
+        ((owner != '') & ~owner.str.fullmatch(PLAN_OWNER_PATTERN), "Responsable solo letras y espacios"),
+        (plazo.isna(), "Plazo no es una fecha válida"),
+        (plazo.dt.normalize() < pd.Timestamp(today), "Plazo no puede ser anterior a hoy"),
+        (~text['Prioridad'].isin(PLAN_PRIORITIES), "Prioridad debe ser Alta, Media o Baja"),
+        (~avance.between(0, 100), "% Avance debe estar entre 0 y 100"),
+        (~(costo >= 0), "Costo Estimado debe ser un número no negativo"),
+        (~estado.isin(PLAN_STATUS_LABELS), "Estado no válido"),
+        (estado.isin(PLAN_STATUS_LABELS) & avance.between(0, 100) & (estado != derived), "Estado no corresponde a % Avance")
+    ]
+    errors = pd.Series('', index=plans.index)
+    for mask, message in rules:
+        errors = errors.mask(mask.to_numpy(), errors + message + '; ')
+    invalid = (errors != '').to_numpy()
+    report = pd.DataFrame({
+        'Fila': np.flatnonzero(invalid) + 2,
+        'Errores': errors[invalid].str.rstrip('; ').to_numpy()
+    })
+    valid = ~invalid
+    plans = pd.DataFrame({
+        'Departamento': text['Departamento'][valid],
+        'Problema': text['Problema'][valid],
+        'Acción': text['Acción'][valid],
+        'Responsable': owner[valid].str.split().str.join(' '),
+        'Plazo': plazo[valid].dt.normalize(),
+        'Estado': estado[valid],
+        'Prioridad': text['Prioridad'][valid],
+        '% Avance': avance[valid].round().astype(int),
+        'Costo Estimado': costo[valid].round().astype(int)
+    }).reset_index(drop=True)
+    return plans, report
+
+def read_plan_file(uploaded):
+    """Parse an uploaded CSV (UTF-8 or Latin-1, as Excel saves it) or XLSX into a frame."""
+    if uploaded.name.lower().endswith('.xlsx'):
+        return pd.read_excel(uploaded, engine='openpyxl')
+    try:
+        return pd.read_csv(uploaded, encoding='utf-8-sig')
+    except UnicodeDecodeError:
+        uploaded.seek(0)
+        return pd.read_csv(uploaded, encoding='latin-1')
+
+def render_plan_import(store):
+    """Bulk import: validate the whole file at once, then insert the valid rows in one batch."""
+    message = st.session_state.pop('plans_import_message', None)
+    if message:
+        st.success(message, icon="✅")
+    st.caption(f"Columnas: {', '.join(PLAN_IMPORT_COLUMNS)}. Estado es opcional, se deriva de % Avance y debe coincidir con él.")
+    # A new key per completed import clears the uploader
+    uploaded = st.file_uploader("Archivo CSV o Excel", type=['csv', 'xlsx'], key=f"plans_import_{st.session_state.get('plans_import_run', 0)}")
+    if uploaded is None:
+        return
+    try:
+        valid, report = validate_plans(read_plan_file(uploaded), plan_departments(), date.today())
+    except Exception as e:
+        logger.error(f"Error reading action plan import: {e}")
+        st.error(f"Error al leer archivo: {e}", icon="🚨")
+        return
+    col1, col2 = st.columns(2)
+    col1.metric("Filas válidas", f"{len(valid):,}")
+    col2.metric("Filas con errores", f"{len(report):,}")
+    if not report.empty:
+        st.dataframe(report, hide_index=True, use_container_width=True, height=200)
+        st.download_button(
+            "⬇️ Reporte de errores",
+            report.to_csv(index=False).encode('utf-8'),
+            file_name="errores_importacion.csv",
+            mime="text/csv",
+            key="plans_import_report"
+        )
+    elif not valid.empty:
+        st.dataframe(valid.head(PLAN_PAGE_SIZES[0]), hide_index=True, use_container_width=True, height=200)
+    if st.button(f"💾 Importar {len(valid):,} planes válidos", disabled=valid.empty, use_container_width=True, key="plans_import_submit"):
+        try:
+            ids = store.insert(valid)
+            logger.info(f"Imported {len(ids)} action plans")
+            st.session_state['plans_import_run'] = st.session_state.get('plans_import_run', 0) + 1
+            st.session_state['plans_import_message'] = f"{len(ids):,} planes importados (#{ids[0]}–#{ids[-1]})."
+            rerun_section()
+        except Exception as e:
+            logger.error(f"Error importing action plans: {e}")
+            st.error(f"Error al importar planes: {e}", icon="🚨")
+
+@fragment
 def render_action_plans_tab(departamentos_filtro, start_date, end_date):
     logger.info("Rendering Action Plans tab")
     st.markdown("#### 📝 Planes de Acción")
-    filtered_plans = filter_dataframe(st.session_state.action_plans_df, departamentos_filtro, start_date, end_date, date_column='Plazo')
+    store = action_plan_store()
     
     col1, col2 = st.columns([3, 1])
     with col1:
         st.markdown("**📌 Planes Registrados**")
-        if filtered_plans.empty:
-            logger.warning("Filtered Action Plans DataFrame is empty")
-            st.info("ℹ️ No hay planes para los filtros seleccionados.", icon="ℹ️")
-        else:
-            def progress_bar(row):
-                color = COLOR_PALETTE['success'] if row['% Avance'] == 100 else COLOR_PALETTE['warning'] if row['% Avance'] > 0 else COLOR_PALETTE['danger']
-                return f'<div class="progress-bar"><div class="progress-bar-fill" style="width: {row["% Avance"]}%; background: {color};"></div></div>'
-            
-            styled_plans = filtered_plans.copy()
-            styled_plans['Progreso'] = styled_plans.apply(progress_bar, axis=1)
-            try:
-                st.dataframe(
-                    styled_plans.style.apply(
-                        lambda x: [
-                            f"background-color: {COLOR_PALETTE['success']}; color: white" if v == 'Completado'
-                            else f"background-color: {COLOR_PALETTE['warning']}" if v == 'En progreso'
-                            else f"background-color: {COLOR_PALETTE['danger']}; color: white"
-                            for v in x
-                        ], subset=['Estado']
-                    ).format({
-                        'Plazo': lambda x: x.strftime('%d/%m/%Y') if pd.notnull(x) else '',
-                        '% Avance': '{:.0f}%',
-                        'Costo Estimado': 'MXN {:,.0f}'
-                    }),
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config={
-                        'Progreso': st.column_config.TextColumn('Progreso', width="small")
-                    },
-                    height=400
-                )
-            except Exception as e:
-                logger.error(f"Error rendering Action Plans table: {e}")
-                st.warning(f"Error al renderizar planes: {e}", icon="🚨")
+        render_action_plans_grid(store, departamentos_filtro, start_date, end_date)
     
     with col2:
         st.markdown("**📊 Resumen por Estado**")
-        if not filtered_plans.empty:
+        status_summary = store.status_counts(departamentos_filtro, start_date, end_date)
+        if not status_summary.empty:
             try:
-                status_summary = filtered_plans['Estado'].value_counts().reset_index()
-                fig_status = px.pie(
-                    status_summary,
-                    values='count',
-                    names='Estado',
-                    color='Estado',
-                    color_discrete_map={
-                        'Completado': COLOR_PALETTE['success'],
-                        'En progreso': COLOR_PALETTE['warning'],
-                        'Pendiente': COLOR_PALETTE['danger']
-                    },
-                    height=250
-                )
-                fig_status.update_layout(
-                    margin=dict(l=20, r=20, t=20, b=20),
-                    font=dict(family="Inter", size=12)
-                )
+                def build_figure():
+                    fig_status = px.pie(
+                        status_summary,
+                        values='count',
+                        names='Estado',
+                        color='Estado',
+                        color_discrete_map={
+                            'Completado': COLOR_PALETTE['success'],
+                            'En progreso': COLOR_PALETTE['warning'],
+                            'Pendiente': COLOR_PALETTE['danger']
+                        },
+                        height=250
+                    )
+                    fig_status.update_layout(
+                        margin=dict(l=20, r=20, t=20, b=20),
+                        font=dict(family="Inter", size=12)
+                    )
+                    return fig_status
+                fig_status = cached_figure("plans_status", tuple(status_summary.itertuples(index=False, name=None)), build_figure)
                 st.plotly_chart(fig_status, use_container_width=True)
             except Exception as e:
                 logger.error(f"Error rendering Action Plans pie chart: {e}")
                 st.warning(f"Error al renderizar resumen: {e}", icon="🚨")
         
         st.markdown("**📅 Vencimientos Próximos**")
-        today = date.today()
-        upcoming = filtered_plans[filtered_plans['Plazo'].dt.date <= today + timedelta(days=30)]
-        if not upcoming.empty:
-            for _, row in upcoming.iterrows():
-                days_left = (row['Plazo'].date() - today).days
-                color = COLOR_PALETTE['danger'] if days_left < 7 else COLOR_PALETTE['warning']
-                text = f"Vence en {days_left} días" if days_left > 0 else f"Vencido hace {-days_left} días"
-                st.markdown(f"""
-                <div class="card">
-                    <div style="font-weight: 600;">{row['Departamento']}</div>
-                    <div style="font-size: 0.8rem; color: var(--muted);">{row['Problema'][:30]}...</div>
-                    <div style="font-size: 0.8rem; color: {color};">{text}</div>
-                </div>
-                """, unsafe_allow_html=True)
-        else:
-            st.info("ℹ️ No hay vencimientos próximos.", icon="ℹ️")
+        render_deadlines_panel(store, departamentos_filtro, start_date, end_date)
     
+    today = date.today()
     with st.expander("➕ Nuevo Plan", expanded=False):
         with st.form("nuevo_plan_form", clear_on_submit=True):
             st.markdown("**Registrar Nuevo Plan**")
             col1, col2 = st.columns(2)
             with col1:
-                dept = st.selectbox("Departamento", DEPARTMENTS)
-                problema = st.text_area("Problema", max_chars=200)
-                prioridad = st.selectbox("Prioridad", ["Alta", "Media", "Baja"])
+                dept = st.selectbox("Departamento", plan_departments())
+                problema = st.text_area("Problema", max_chars=PLAN_TEXT_LIMIT)
+                prioridad = st.selectbox("Prioridad", PLAN_PRIORITIES)
                 costo = st.number_input("Costo Estimado (MXN)", min_value=0, value=10000, step=1000)
             with col2:
-                accion = st.text_area("Acción", max_chars=200)
+                accion = st.text_area("Acción", max_chars=PLAN_TEXT_LIMIT)
                 responsable = st.text_input("Responsable")
                 plazo = st.date_input(
                     "Plazo",
@@ -1132,48 +2738,258 @@ def render_action_plans_tab(departamentos_filtro, start_date, end_date):
             submitted = st.form_submit_button("💾 Guardar", use_container_width=True)
             
             if submitted:
-                errors = []
-                if not problema:
-                    errors.append("Problema es obligatorio")
-                if len(problema) > 200:
-                    errors.append("Problema no puede exceder 200 caracteres")
-                if not accion:
-                    errors.append("Acción es obligatoria")
-                if len(accion) > 200:
-                    errors.append("Acción no puede exceder 200 caracteres")
-                if not responsable:
-                    errors.append("Responsable es obligatorio")
-                if not re.match(r'^[A-Za-z\s]+$', responsable):
-                    errors.append("Responsable solo letras y espacios")
-                if plazo < today:
-                    errors.append("Plazo no puede ser anterior a hoy")
+                new_plan, report = validate_plans(pd.DataFrame([{
+                    'Departamento': dept,
+                    'Problema': problema,
+                    'Acción': accion,
+                    'Responsable': responsable,
+                    'Plazo': pd.Timestamp(plazo),
+                    'Prioridad': prioridad,
+                    '% Avance': avance,
+                    'Costo Estimado': costo
+                }]), plan_departments(), today)
                 
-                if errors:
-                    for error in errors:
+                if not report.empty:
+                    for error in report['Errores'].iloc[0].split('; '):
                         st.markdown(f"<p class='error-message'>{error}</p>", unsafe_allow_html=True)
                 else:
                     try:
-                        new_plan = pd.DataFrame([{
-                            'ID': len(st.session_state.action_plans_df) + 1,
-                            'Departamento': dept,
-                            'Problema': problema,
-                            'Acción': accion,
-                            'Responsable': responsable,
-                            'Plazo': pd.Timestamp(plazo),
-                            'Estado': 'Pendiente' if avance == 0 else 'En progreso' if avance < 100 else 'Completado',
-                            'Prioridad': prioridad,
-                            '% Avance': avance,
-                            'Costo Estimado': costo
-                        }])
-                        st.session_state.action_plans_df = pd.concat([st.session_state.action_plans_df, new_plan], ignore_index=True)
-                        st.success("✅ Plan registrado.", icon="✅")
-                        st.rerun()
+                        plan_id, = action_plan_store().insert(new_plan)
+                        st.success(f"✅ Plan #{plan_id} registrado.", icon="✅")
+                        rerun_section()
                     except Exception as e:
                         logger.error(f"Error registering new plan: {e}")
                         st.error(f"Error al registrar plan: {e}", icon="🚨")
+    
+    with st.expander("📥 Importar Planes", expanded=False):
+        render_plan_import(store)
 
 # ========== EXPORT AND REPORTING ==========
-def render_export_section(nom_df, lean_df, bienestar_df):
+# Rows encoded per step; bounds the text held in memory while writing (not serving) an export
+EXPORT_CHUNK_ROWS = int(os.environ.get('DASHBOARD_EXPORT_CHUNK_ROWS', 50_000))
+EXPORT_FILE_NAMES = {'NOM-035': 'nom035', 'LEAN 2.0': 'lean', 'Bienestar': 'bienestar', 'Planes de Acción': 'planes_accion'}
+EXPORT_TABLES = {'NOM-035': 'nom', 'LEAN 2.0': 'lean', 'Bienestar': 'bienestar'}
+
+def frame_chunks(df, size=None):
+    """Consecutive row slices of df; an empty frame still yields one chunk with its columns."""
+    size = size or EXPORT_CHUNK_ROWS
+    for begin in range(0, max(len(df), 1), size):
+        yield df.iloc[begin:begin + size]
+
+def export_datasets(labels, filters=None):
+    """(label, chunk iterator) per selected dataset, each in its own schema.
+
+    filters, as (departments, start, end), restricts every dataset to the view shown
+    in the tabs.
+    """
+    departments, start, end = filters or (None, None, None)
+    for label in labels:
+        if label == 'Planes de Acción':
+            yield label, action_plan_store().chunks(departments, start, end, EXPORT_CHUNK_ROWS)
+            continue
+        table = EXPORT_TABLES[label]
+        df = dataset_store().frames[table]
+        if filters:
+            df = filter_dataframe(table, departments if 'Departamento' in df.columns else [], start, end)
+        yield label, frame_chunks(df)
+
+def write_csv(handle, chunks):
+    """Stream chunks to a text handle as one CSV with a single header row."""
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(handle, index=False, header=i == 0)
+
+def write_json(handle, datasets):
+    """Stream {"dataset": [records, ...], ...} to a text handle one chunk at a time."""
+    handle.write('{')
+    for i, (label, chunks) in enumerate(datasets):
+        handle.write(('' if i == 0 else ',') + json.dumps(label, ensure_ascii=False) + ':[')
+        first = True
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            records = chunk.to_json(orient='records', date_format='iso', force_ascii=False)[1:-1]
+            handle.write(records if first else ',' + records)
+            first = False
+        handle.write(']')
+    handle.write('}')
+
+EXCEL_SHEET_NAMES = {'NOM-035': 'NOM-035', 'LEAN 2.0': 'LEAN', 'Bienestar': 'Bienestar', 'Planes de Acción': 'Planes'}
+EXCEL_DATE_FORMAT = 'DD/MM/YYYY'
+EXCEL_NUMBER_FORMATS = {'Costo Estimado': '"$"#,##0', '% Avance': '0'}
+# Rows per worksheet in Excel, header included
+EXCEL_MAX_ROWS = 1_048_576
+
+def excel_formats(df):
+    """Number format per column position: named columns first, then dates and one-decimal floats."""
+    formats = {}
+    for i, (col, dtype) in enumerate(df.dtypes.items()):
+        if col in EXCEL_NUMBER_FORMATS:
+            formats[i] = EXCEL_NUMBER_FORMATS[col]
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            formats[i] = EXCEL_DATE_FORMAT
+        elif pd.api.types.is_float_dtype(dtype):
+            formats[i] = '0.0'
+    return formats
+
+def start_sheet(workbook, title, columns):
+    """New write-only sheet with a bold, frozen header row."""
+    sheet = workbook.create_sheet(title)
+    sheet.freeze_panes = 'A2'
+    for i, col in enumerate(columns, start=1):
+        sheet.column_dimensions[openpyxl.utils.get_column_letter(i)].width = max(12, len(str(col)) + 2)
+    header = []
+    for col in columns:
+        cell = openpyxl.cell.WriteOnlyCell(sheet, value=col)
+        cell.font = openpyxl.styles.Font(bold=True)
+        header.append(cell)
+    sheet.append(header)
+    return sheet
+
+def write_sheet(workbook, title, chunks):
+    """Stream chunks into new write-only sheets, each with a bold, frozen header.
+
+    Rows are serialized to the sheet's temp file as they are appended; only the
+    formatted cells are wrapped in WriteOnlyCell, the rest go in as plain values.
+    Past EXCEL_MAX_ROWS the table continues in sheets named title_2, title_3, ...
+    """
+    formats = None
+    for chunk in chunks:
+        if formats is None:
+            formats = excel_formats(chunk)
+            columns, part = chunk.columns, 1
+            sheet, sheet_rows = start_sheet(workbook, title, columns), 1
+        # float32 metrics widened and rounded so 85.3 is not stored as 85.30000305
+        floats = chunk.select_dtypes('float').columns
+        if len(floats):
+            chunk = chunk.astype({col: 'float64' for col in floats}).round({col: 4 for col in floats})
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if sheet_rows == EXCEL_MAX_ROWS:
+                part += 1
+                sheet, sheet_rows = start_sheet(workbook, f"{title}_{part}", columns), 1
+            row = list(row)
+            for i, number_format in formats.items():
+                if row[i] is not None:
+                    cell = openpyxl.cell.WriteOnlyCell(sheet, value=row[i])
+                    cell.number_format = number_format
+                    row[i] = cell
+            sheet.append(row)
+            sheet_rows += 1
+
+def excel_summaries(labels, filters=None):
+    """Per-department metric means of the selected NOM-035/LEAN tables, from their cubes.
+
+    Covers the filtered window when filters are given, otherwise every department
+    and period.
+    """
+    summaries = []
+    for label in ('NOM-035', 'LEAN 2.0'):
+        if label in labels:
+            cube = metric_cube(EXPORT_TABLES[label])
+            departments, start, end = filters or ([], cube.periods[0], cube.periods[-1])
+            means = cube.department_means(departments, cube.metrics, start, end)
+            summaries.append((f"Resumen {EXCEL_SHEET_NAMES[label]}", means.round(1).reset_index()))
+    return summaries
+
+# Codecs offered per columnar format, default first
+EXPORT_COMPRESSION = {'Parquet': ['zstd', 'snappy'], 'Arrow': ['zstd', 'lz4']}
+ARROW_FORMATS = {'Parquet': ('parquet', 'application/vnd.apache.parquet'), 'Arrow': ('arrow', 'application/vnd.apache.arrow.file')}
+
+def arrow_tables(chunks):
+    """Chunks as Arrow tables sharing one schema.
+
+    Categoricals keep every category seen so far, in front, so a column's dictionary
+    only grows (IPC files take dictionary deltas, not replacements); dictionary indices
+    are widened to int32 so the schema does not depend on a chunk's category count.
+    """
+    categories, schema = {}, None
+    for chunk in chunks:
+        updates = {}
+        for col in chunk.select_dtypes('category').columns:
+            known, current = categories.get(col), chunk[col].cat.categories
+            if known is None:
+                categories[col] = current
+            elif not current.equals(known):
+                categories[col] = known.append(current.difference(known))
+                updates[col] = chunk[col].cat.set_categories(categories[col])
+        if updates:
+            chunk = chunk.assign(**updates)
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if schema is None:
+            schema = pa.schema(
+                [
+                    field.with_type(pa.dictionary(pa.int32(), field.type.value_type)) if pa.types.is_dictionary(field.type) else field
+                    for field in table.schema
+                ],
+                metadata=table.schema.metadata
+            )
+        yield table.cast(schema)
+
+def write_arrow(handle, export_format, chunks, compression):
+    """Stream chunks to a binary handle as Parquet (one row group per chunk) or an Arrow IPC file."""
+    writer = None
+    try:
+        for table in arrow_tables(chunks):
+            if writer is None:
+                if export_format == "Parquet":
+                    writer = pq.ParquetWriter(handle, table.schema, compression=compression)
+                else:
+                    options = pa.ipc.IpcWriteOptions(compression=compression, emit_dictionary_deltas=True)
+                    writer = pa.ipc.new_file(handle, table.schema, options=options)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def write_export(export_format, datasets, summaries=(), compression=None):
+    """Write the export into an anonymous temp file and return it with its extension and MIME type.
+
+    A single CSV dataset is a plain .csv; several go into a .zip with one CSV per
+    dataset, so no table is padded with another's columns. Excel gets one sheet per
+    dataset plus the (title, frame) summaries, in write-only mode. Parquet and Arrow
+    keep the loaded dtypes and are compressed with the given codec; several datasets
+    are stored uncompressed in a .zip, one file each.
+    """
+    output = tempfile.TemporaryFile()
+    if export_format == "Excel":
+        workbook = openpyxl.Workbook(write_only=True)
+        for label, chunks in datasets:
+            write_sheet(workbook, EXCEL_SHEET_NAMES[label], chunks)
+        for title, summary in summaries:
+            write_sheet(workbook, title, frame_chunks(summary))
+        workbook.save(output)
+        ext, mime = "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    elif export_format in ARROW_FORMATS:
+        ext, mime = ARROW_FORMATS[export_format]
+        if len(datasets) > 1:
+            with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+                for label, chunks in datasets:
+                    with archive.open(f"{EXPORT_FILE_NAMES[label]}.{ext}", 'w') as handle:
+                        write_arrow(handle, export_format, chunks, compression)
+            ext, mime = "zip", "application/zip"
+        else:
+            write_arrow(output, export_format, datasets[0][1], compression)
+    elif export_format == "CSV" and len(datasets) > 1:
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for label, chunks in datasets:
+                with io.TextIOWrapper(archive.open(f"{EXPORT_FILE_NAMES[label]}.csv", 'w'), encoding='utf-8', newline='') as handle:
+                    write_csv(handle, chunks)
+        ext, mime = "zip", "application/zip"
+    else:
+        handle = io.TextIOWrapper(output, encoding='utf-8', newline='')
+        if export_format == "CSV":
+            write_csv(handle, datasets[0][1])
+            ext, mime = "csv", "text/csv"
+        else:
+            write_json(handle, datasets)
+            ext, mime = "json", "application/json"
+        handle.flush()
+        handle.detach()
+    output.seek(0)
+    return output, ext, mime
+
+@fragment
+def render_export_section(departamentos_filtro, start_date, end_date):
     logger.info("Rendering export section")
     st.markdown("---")
     st.markdown("#### 📤 Exportar y Reportes")
@@ -1206,64 +3022,135 @@ def render_export_section(nom_df, lean_df, bienestar_df):
     with col3:
         with st.expander("📊 Exportar Datos", expanded=False):
             st.markdown("**Exportar Datos**")
-            export_format = st.radio("Formato", ["CSV", "Excel", "JSON"], horizontal=True)
-            data_options = st.multiselect("Datos", ["NOM-035", "LEAN 2.0", "Bienestar", "Planes de Acción"], default=["NOM-035", "LEAN 2.0", "Bienestar"])
+            export_format = st.radio("Formato", ["CSV", "Excel", "JSON", "Parquet", "Arrow"], horizontal=True)
+            compression = None
+            if export_format in EXPORT_COMPRESSION:
+                compression = st.selectbox("Compresión", EXPORT_COMPRESSION[export_format], key=f"export_compression_{export_format}")
+            data_options = st.multiselect("Datos", list(EXPORT_FILE_NAMES), default=["NOM-035", "LEAN 2.0", "Bienestar"])
+            filtered_only = st.checkbox("Solo vista filtrada", value=False, help="Departamentos y periodo seleccionados en la barra lateral")
+            include_summary = st.checkbox("Hojas de resumen", value=True, disabled=export_format != "Excel", help="Promedios por departamento de NOM-035 y LEAN (solo Excel)")
             if st.button("💾 Descargar", use_container_width=True):
                 if not data_options:
                     st.markdown("<p class='error-message'>Seleccione al menos un tipo de datos</p>", unsafe_allow_html=True)
                 else:
                     with st.spinner("Preparando datos..."):
                         try:
-                            export_data = []
-                            if "NOM-035" in data_options and not nom_df.empty:
-                                export_data.append(nom_df.assign(Tipo="NOM-035"))
-                            if "LEAN 2.0" in data_options and not lean_df.empty:
-                                export_data.append(lean_df.assign(Tipo="LEAN"))
-                            if "Bienestar" in data_options and not bienestar_df.empty:
-                                export_data.append(bienestar_df.assign(Tipo="Bienestar"))
-                            if "Planes de Acción" in data_options and not st.session_state.action_plans_df.empty:
-                                export_data.append(st.session_state.action_plans_df.assign(Tipo="Planes_Accion"))
-                            
-                            if not export_data:
-                                logger.warning("No valid data to export")
-                                st.warning("🚨 No hay datos válidos.", icon="🚨")
-                                return
-                            
-                            combined_data = pd.concat([df for df in export_data], ignore_index=True, sort=False)
-                            
-                            if export_format == "CSV":
-                                data = combined_data.to_csv(index=False).encode('utf-8')
-                                mime = "text/csv"
-                                ext = "csv"
-                            elif export_format == "Excel":
-                                output = io.BytesIO()
-                                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                                    combined_data.to_excel(writer, index=False, sheet_name='Data')
-                                data = output.getvalue()
-                                mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                                ext = "xlsx"
-                            else:
-                                data = combined_data.to_json(orient='records', date_format='iso').encode('utf-8')
-                                mime = "application/json"
-                                ext = "json"
-                            
-                            st.success(f"✅ Datos exportados como {export_format}.", icon="✅")
-                            st.download_button(
-                                label=f"📥 Descargar .{ext}",
-                                data=data,
-                                file_name=f"nom_lean_data_{datetime.now().strftime('%Y%m%d')}.{ext}",
-                                mime=mime,
-                                use_container_width=True
-                            )
+                            filters = (departamentos_filtro, start_date, end_date) if filtered_only else None
+                            summaries = excel_summaries(data_options, filters) if export_format == "Excel" and include_summary else ()
+                            output, ext, mime = write_export(export_format, list(export_datasets(data_options, filters)), summaries, compression)
+                            with output:
+                                size = os.fstat(output.fileno()).st_size
+                                logger.info(f"Exported {', '.join(data_options)} as {ext}: {size:,} bytes")
+                                st.success(f"✅ Datos exportados como {export_format} ({size / 1024:,.0f} KB).", icon="✅")
+                                # Writing is chunked, but Streamlit reads the whole file into memory
+                                # to serve it, so each download still holds the full export once
+                                st.download_button(
+                                    label=f"📥 Descargar .{ext}",
+                                    data=output.raw,
+                                    file_name=f"nom_lean_data_{datetime.now().strftime('%Y%m%d')}.{ext}",
+                                    mime=mime,
+                                    use_container_width=True
+                                )
                         except Exception as e:
                             logger.error(f"Error exporting data: {e}")
                             st.error(f"Error al exportar datos: {e}", icon="🚨")
 
+# ========== DIAGNOSTICS ==========
+def payload_benchmark():
+    """JSON size of the NOM-035 and LEAN line charts over all departments and periods,
+    built from a long-form frame with px.line versus from the cube arrays."""
+    store = dataset_store()
+    rows = []
+    for table, label in (('nom', 'NOM-035'), ('lean', 'LEAN 2.0')):
+        cube = store.cubes[table]
+        metrics, start, end = cube.metrics, cube.periods[0], cube.periods[-1]
+        long_form = px.line(
+            cube.long_series([], metrics, start, end),
+            x='Mes', y='Valor', color='Departamento', facet_col='Métrica', facet_col_wrap=2
+        )
+        compact = build_line_facets(cube, [], metrics, start, end, 0, '')
+        rows.append((label, len(long_form.to_json()) / 1024, len(compact.to_json()) / 1024))
+    report = pd.DataFrame(rows, columns=['Gráfico', 'Formato largo (KB)', 'Compacto (KB)'])
+    report['Reducción (%)'] = (1 - report['Compacto (KB)'] / report['Formato largo (KB)']) * 100
+    return report
+
+def render_diagnostics_section():
+    logger.info("Rendering diagnostics section")
+    with st.expander("🧮 Diagnóstico de rendimiento", expanded=False):
+        st.markdown("**Memoria por tabla**")
+        try:
+            st.dataframe(
+                memory_report().style.format({
+                    'Antes (KB)': '{:,.1f}',
+                    'Después (KB)': '{:,.1f}',
+                    'Reducción (%)': '{:.0f}%'
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+        except Exception as e:
+            logger.error(f"Error rendering memory report: {e}")
+            st.warning(f"Error al calcular memoria: {e}", icon="🚨")
+        
+        st.markdown("**Caché de filtros**")
+        stats = get_filter_cache().stats()
+        lookups = stats['hits'] + stats['misses']
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Aciertos", f"{stats['hits']:,}", f"{stats['hits'] / lookups * 100:.0f}%" if lookups else None)
+        col2.metric("Fallos", f"{stats['misses']:,}")
+        col3.metric("Tamaño", f"{stats['bytes'] / 1024 ** 2:.1f} / {stats['max_bytes'] / 1024 ** 2:.0f} MB")
+        
+        st.markdown("**Caché de gráficos**")
+        stats = get_figure_cache().stats()
+        lookups = stats['hits'] + stats['misses']
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Aciertos", f"{stats['hits']:,}", f"{stats['hits'] / lookups * 100:.0f}%" if lookups else None)
+        col2.metric("Fallos", f"{stats['misses']:,}")
+        col3.metric("Tamaño", f"{stats['bytes'] / 1024 ** 2:.1f} / {stats['max_bytes'] / 1024 ** 2:.0f} MB")
+        
+        st.markdown("**Carga por gráfico**")
+        sizes = get_figure_cache().view_bytes()
+        if sizes:
+            st.dataframe(
+                pd.DataFrame({'Gráfico': list(sizes), 'KB': [nbytes / 1024 for nbytes in sizes.values()]})
+                .style.format({'KB': '{:,.1f}'}),
+                use_container_width=True,
+                hide_index=True
+            )
+        if st.button("📏 Comparar codificación de gráficos", key="payload_benchmark"):
+            try:
+                st.dataframe(
+                    payload_benchmark().style.format({
+                        'Formato largo (KB)': '{:,.1f}',
+                        'Compacto (KB)': '{:,.1f}',
+                        'Reducción (%)': '{:.0f}%'
+                    }),
+                    use_container_width=True,
+                    hide_index=True
+                )
+            except Exception as e:
+                logger.error(f"Error running payload benchmark: {e}")
+                st.warning(f"Error al medir carga: {e}", icon="🚨")
+        
+        st.markdown("**Arranque del proceso**")
+        report = startup_report()
+        timings = [(f"Importación: {name}", seconds) for name, seconds in report['imports'].items()]
+        timings += list(report['stages'].items())
+        st.dataframe(
+            pd.DataFrame(timings, columns=['Etapa', 'Segundos']).style.format({'Segundos': '{:.3f}'}),
+            use_container_width=True,
+            hide_index=True
+        )
+
 # ========== MAIN FUNCTION ==========
 def main():
     logger.info("Starting main function")
     try:
-        sidebar_data = render_sidebar()
+        sidebar_data = render_sidebar(
+            nom_df['Departamento'].unique().tolist(),
+            nom_df['Mes'].min().date(),
+            nom_df['Mes'].max().date()
+        )
         if sidebar_data is None or sidebar_data[0] is None or sidebar_data[1] is None or not sidebar_data[2]:
             logger.warning("Invalid sidebar data")
             st.warning("🚨 Configure los filtros en la barra lateral.", icon="🚨")
@@ -1276,55 +3163,39 @@ def main():
         
         st.markdown("### Indicadores Clave")
         cols = st.columns(4)
-        filtered_nom = filter_dataframe(nom_df, departamentos_filtro, start_date, end_date)
-        filtered_lean = filter_dataframe(lean_df, departamentos_filtro, start_date, end_date)
-        filtered_bienestar = filter_dataframe(bienestar_df, [], start_date, end_date)
+        nom_cube, lean_cube, bienestar_cube = metric_cube('nom'), metric_cube('lean'), metric_cube('bienestar')
+        
+        def window_kpi(cube, departments, metric):
+            # Window mean, and its change against the preceding window of equal length
+            value = cube.mean(departments, metric, start_date, end_date)
+            if np.isnan(value):
+                return 0, 0
+            previous = cube.mean(departments, metric, *previous_window(start_date, end_date))
+            return value, None if np.isnan(previous) else value - previous
+        
+        nom_value, nom_delta = window_kpi(nom_cube, departamentos_filtro, 'Evaluaciones')
+        lean_value, lean_delta = window_kpi(lean_cube, departamentos_filtro, 'Eficiencia')
+        wellbeing_value, wellbeing_delta = window_kpi(bienestar_cube, [], 'Índice Bienestar')
         kpis = [
-            (
-                filtered_nom['Evaluaciones'].mean() if not filtered_nom.empty and 'Evaluaciones' in filtered_nom.columns else 0,
-                "Cumplimiento NOM-035",
-                nom_target,
-                "📋",
-                filtered_nom['Evaluaciones'].mean() - filtered_nom.groupby('Departamento')['Evaluaciones'].mean().shift(1).mean() if not filtered_nom.empty and 'Evaluaciones' in filtered_nom.columns else 0
-            ),
-            (
-                filtered_lean['Eficiencia'].mean() if not filtered_lean.empty and 'Eficiencia' in filtered_lean.columns else 0,
-                "Adopción LEAN 2.0",
-                lean_target,
-                "🔄",
-                filtered_lean['Eficiencia'].mean() - filtered_lean.groupby('Departamento')['Eficiencia'].mean().shift(1).mean() if not filtered_lean.empty and 'Eficiencia' in filtered_lean.columns else 0
-            ),
-            (
-                filtered_bienestar['Índice Bienestar'].mean() if not filtered_bienestar.empty and 'Índice Bienestar' in filtered_bienestar.columns else 0,
-                "Índice Bienestar",
-                wellbeing_target,
-                "😊",
-                filtered_bienestar['Índice Bienestar'].mean() - filtered_bienestar['Índice Bienestar'].shift(1).mean() if not filtered_bienestar.empty and 'Índice Bienestar' in filtered_bienestar.columns else 0
-            ),
-            (
-                filtered_lean['Eficiencia'].mean() if not filtered_lean.empty and 'Eficiencia' in filtered_lean.columns else 0,
-                "Eficiencia Operativa",
-                efficiency_target,
-                "⚙️",
-                filtered_lean['Eficiencia'].mean() - filtered_lean.groupby('Departamento')['Eficiencia'].mean().shift(1).mean() if not filtered_lean.empty and 'Eficiencia' in filtered_lean.columns else 0
-            )
+            (nom_value, "Cumplimiento NOM-035", nom_target, "📋", nom_delta),
+            (lean_value, "Adopción LEAN 2.0", lean_target, "🔄", lean_delta),
+            (wellbeing_value, "Índice Bienestar", wellbeing_target, "😊", wellbeing_delta),
+            (lean_value, "Eficiencia Operativa", efficiency_target, "⚙️", lean_delta)
         ]
         for i, (value, title, target, icon, delta) in enumerate(kpis):
             with cols[i]:
                 kpi_card(value, title, target, icon, delta)
         
-        tab1, tab2, tab3, tab4 = st.tabs(["📋 NOM-035", "🔄 LEAN 2.0", "😊 Bienestar", "📝 Planes de Acción"])
-        
-        with tab1:
-            render_nom_tab(nom_df, departamentos_filtro, nom_target, start_date, end_date, nom_metrics)
-        with tab2:
-            render_lean_tab(lean_df, departamentos_filtro, lean_target, start_date, end_date, lean_metrics)
-        with tab3:
-            render_wellbeing_tab(bienestar_df, start_date, end_date, wellbeing_target)
-        with tab4:
-            render_action_plans_tab(departamentos_filtro, start_date, end_date)
+        render_views({
+            "📋 NOM-035": lambda: render_nom_tab(departamentos_filtro, nom_target, start_date, end_date, nom_metrics),
+            "🔄 LEAN 2.0": lambda: render_lean_tab(departamentos_filtro, lean_target, start_date, end_date, lean_metrics),
+            "😊 Bienestar": lambda: render_wellbeing_tab(start_date, end_date, wellbeing_target),
+            "📝 Planes de Acción": lambda: render_action_plans_tab(departamentos_filtro, start_date, end_date)
+        }, key="main_tab")
         
-        render_export_section(nom_df, lean_df, bienestar_df)
+        render_export_section(departamentos_filtro, start_date, end_date)
+        startup_report()['stages'].setdefault('Primer render', time.perf_counter() - _SCRIPT_START)
+        render_diagnostics_section()
         
     except Exception as e:
         logger.error(f"Error in main function: {e}")